@@ -0,0 +1,83 @@
+### Cache Warming
+import collections
+import datetime as dt
+import threading
+import time
+
+import pandas as pd
+
+from price_ranges import (
+    MARKET_TIMEZONE,
+    get_next_close,
+    get_warmup_start,
+    load_segment,
+    refresh_segment,
+    store_segment,
+)
+
+# Default ticker of every page, warmed before anyone has asked for it
+WARM_TICKERS = ["AMZN"]
+POPULAR_TICKER_COUNT = 10
+# Default start of the date range sliders
+WARM_START_DATE = dt.date(2020, 1, 1)
+
+
+def get_popular_tickers(store, count=POPULAR_TICKER_COUNT):
+    with store["lock"]:
+        requested = [ticker for ticker, _ in store["requests"].most_common(count)]
+    return list(dict.fromkeys(WARM_TICKERS + requested))
+
+
+def warm_tickers(store, tickers, indicator_params, start_date=WARM_START_DATE):
+    end_date = dt.datetime.now().date() + dt.timedelta(days=1)
+    for ticker in tickers:
+        with store["lock"]:
+            segment = store["segments"].get(ticker)
+        try:
+            if segment is None or segment["indicator_params"] != indicator_params:
+                warmed = load_segment(
+                    ticker, get_warmup_start(start_date), end_date, indicator_params
+                )
+                store_segment(store, ticker, warmed, replaces=segment)
+            else:
+                refresh_segment(store, ticker, end_date)
+        except Exception as error:
+            print(f"Warming {ticker} failed: {error}")
+
+
+def evict_segments(store, keep):
+    # Tickers that dropped out of the popular list are loaded again on demand. Counts
+    # are halved each close so popularity follows recent interest
+    with store["lock"]:
+        for ticker in set(store["segments"]) - set(keep):
+            del store["segments"][ticker]
+        store["requests"] = collections.Counter(
+            {
+                ticker: count // 2
+                for ticker, count in store["requests"].items()
+                if count > 1
+            }
+        )
+
+
+def run_cache_warmer(store, indicator_params):
+    while True:
+        popular_tickers = get_popular_tickers(store)
+        warm_tickers(store, popular_tickers, indicator_params)
+        evict_segments(store, popular_tickers)
+
+        # Woken again once the next close has settled
+        wait = get_next_close() - pd.Timestamp.now(tz=MARKET_TIMEZONE)
+        time.sleep(max(wait.total_seconds(), 0))
+
+
+def start_cache_warmer(store, indicator_params):
+    # Once per store: warms the popular tickers now and again after every close
+    with store["lock"]:
+        if "warmer" in store:
+            return store
+        store["warmer"] = threading.Thread(
+            target=run_cache_warmer, args=(store, indicator_params), daemon=True
+        )
+    store["warmer"].start()
+    return store
@@ -0,0 +1,214 @@
+### Multi-Ticker Comparison
+import numpy as np
+import pandas as pd
+import plotly.express as px
+from plotly.subplots import make_subplots
+
+from data_quality import MISSING_PRICE_TOLERANCE, clean_price_frame
+from indicators import compute_indicators
+from price_ranges import (
+    covers_range,
+    get_warmup_start,
+    new_segment,
+    read_price_range,
+    store_segment,
+)
+from yahoo_downloads import download_tickers
+
+COMPARE_TICKERS = ["AAPL", "AMZN", "GOOGL", "META", "MSFT", "NVDA", "TSLA"]
+
+
+def read_comparison_prices(
+    store, tickers, date_range, indicator_params, loaded_prices=None
+):
+    # The selected range plus the MA warm-up, returned as dates x tickers. Frames
+    # the caller already holds, e.g. the primary ticker's, are reused and tickers
+    # held by the shared price segments are read from them
+    loaded_prices = dict(loaded_prices or {})
+    warmup_start = get_warmup_start(date_range[0])
+    with store["lock"]:
+        held = {ticker: store["segments"].get(ticker) for ticker in tickers}
+    missing = [
+        ticker
+        for ticker in tickers
+        if ticker not in loaded_prices
+        and not covers_range(held[ticker], warmup_start, indicator_params)
+    ]
+
+    # Everything else comes from one batched request and seeds the segments
+    if missing:
+        downloaded = download_tickers(missing, warmup_start, date_range[1])
+        for ticker, prices in downloaded.items():
+            if prices.empty:
+                continue
+            segment = new_segment(prices, warmup_start, date_range[1], indicator_params)
+            store_segment(store, ticker, segment, replaces=held[ticker])
+            loaded_prices[ticker] = prices
+
+    adj_close = {}
+    for ticker in tickers:
+        prices = loaded_prices.get(ticker)
+        if prices is None and ticker not in missing:
+            prices, _ = read_price_range(
+                store, ticker, date_range[0], date_range[1], indicator_params
+            )
+        # Tickers the batched request returned nothing for stay empty
+        if prices is not None:
+            adj_close[ticker] = prices["Adj Close"]
+    return pd.DataFrame(adj_close, columns=list(tickers)).sort_index()
+
+
+def build_comparison(
+    adj_close,
+    ma_windows,
+    signal_ma_windows,
+    signal_tolerance,
+    uptick_constant=0.01,
+    downtick_constant=0.075,
+):
+    # Every ticker's MAs and signals come out of one pass over the wide matrix. The
+    # MAs skip prices that failed validation, distances use the prices as quoted
+    prices = adj_close.to_numpy(dtype=float)
+    clean_prices, _ = clean_price_frame(adj_close)
+    moving_averages = compute_indicators(
+        clean_prices.to_numpy(dtype=float),
+        sma_windows=tuple(ma_windows),
+        missing_tolerance=MISSING_PRICE_TOLERANCE,
+    )
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        monthly_change = np.full_like(prices, np.nan)
+        monthly_change[30:] = (prices[30:] - prices[:-30]) / prices[:-30]
+        distances = {
+            window: (prices - moving_averages[f"SMA_{window}"])
+            / moving_averages[f"SMA_{window}"]
+            for window in ma_windows
+        }
+
+    # Same scoring as the single ticker view, the monthly change counts twice
+    buy_signal = 2 * (monthly_change <= -downtick_constant) + sum(
+        distances[window] <= -downtick_constant for window in signal_ma_windows
+    )
+    sell_signal = 2 * (monthly_change >= uptick_constant) + sum(
+        distances[window] >= uptick_constant for window in signal_ma_windows
+    )
+
+    def as_frame(values):
+        return pd.DataFrame(values, index=adj_close.index, columns=adj_close.columns)
+
+    return {
+        "prices": adj_close,
+        "moving_averages": {
+            window: as_frame(moving_averages[f"SMA_{window}"]) for window in ma_windows
+        },
+        "distances": {window: as_frame(distances[window]) for window in ma_windows},
+        "buy": as_frame(buy_signal >= signal_tolerance),
+        "sell": as_frame(sell_signal >= signal_tolerance),
+    }
+
+
+def plot_comparison(comparison, date_range, ma_window):
+    start, end = pd.Timestamp(date_range[0]), pd.Timestamp(date_range[1])
+    prices = comparison["prices"].loc[start:end]
+    moving_average = comparison["moving_averages"][ma_window].loc[start:end]
+    distance = comparison["distances"][ma_window].loc[start:end]
+
+    # Rebased to 100 at each ticker's first price in range, MAs share the same base
+    base = prices.bfill().iloc[0]
+    normalised = prices / base * 100
+    normalised_ma = moving_average / base * 100
+
+    fig = make_subplots(
+        rows=2,
+        cols=1,
+        shared_xaxes=True,
+        row_heights=[0.7, 0.3],
+        vertical_spacing=0.03,
+    )
+    colours = px.colors.qualitative.Plotly
+    for position, ticker in enumerate(prices.columns):
+        colour = colours[position % len(colours)]
+        fig.add_scatter(
+            x=normalised.index,
+            y=normalised[ticker],
+            name=ticker,
+            legendgroup=ticker,
+            line=dict(color=colour),
+            row=1,
+            col=1,
+        )
+        fig.add_scatter(
+            x=normalised_ma.index,
+            y=normalised_ma[ticker],
+            name=f"{ticker} MA_{ma_window}",
+            legendgroup=ticker,
+            line=dict(color=colour, dash="dot", width=1),
+            showlegend=False,
+            row=1,
+            col=1,
+        )
+        for signal, symbol in [("buy", "triangle-up"), ("sell", "triangle-down")]:
+            is_signal = comparison[signal][ticker].loc[start:end]
+            fig.add_scatter(
+                x=normalised.index[is_signal],
+                y=normalised[ticker][is_signal],
+                mode="markers",
+                name=f"{ticker} {signal}",
+                legendgroup=ticker,
+                marker=dict(
+                    color="green" if signal == "buy" else "red",
+                    symbol=symbol,
+                    size=8,
+                    line=dict(color=colour, width=1),
+                ),
+                showlegend=False,
+                row=1,
+                col=1,
+            )
+        fig.add_scatter(
+            x=distance.index,
+            y=distance[ticker],
+            name=f"{ticker} distance",
+            legendgroup=ticker,
+            line=dict(color=colour),
+            showlegend=False,
+            row=2,
+            col=1,
+        )
+
+    fig.update_yaxes(title_text="Rebased price (100)", row=1, col=1)
+    fig.update_yaxes(
+        title_text=f"Distance from MA_{ma_window}", tickformat=".0%", row=2, col=1
+    )
+    fig.update_layout(
+        height=700,
+        hovermode="x unified",
+        legend_orientation="h",
+        margin=dict(l=0, r=0, t=25, b=0),
+    )
+    return fig
+
+
+def summarise_comparison(comparison, date_range, ma_window):
+    in_range = slice(pd.Timestamp(date_range[0]), pd.Timestamp(date_range[1]))
+    prices = comparison["prices"].loc[in_range]
+    distance = comparison["distances"][ma_window].loc[in_range]
+
+    def last_signal_dates(signals):
+        return signals.loc[in_range].apply(
+            lambda is_signal: is_signal[is_signal].index.max()
+        )
+
+    return pd.DataFrame(
+        {
+            "Price": prices.ffill().iloc[-1].round(2),
+            "Change in range %": (
+                (prices.ffill().iloc[-1] / prices.bfill().iloc[0] - 1) * 100
+            ).round(2),
+            f"Distance from MA_{ma_window} %": (
+                distance.ffill().iloc[-1] * 100
+            ).round(2),
+            "Last buy": last_signal_dates(comparison["buy"]),
+            "Last sell": last_signal_dates(comparison["sell"]),
+        }
+    )
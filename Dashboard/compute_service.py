@@ -0,0 +1,154 @@
+### Local Compute Service
+import datetime as dt
+import io
+import json
+import threading
+import urllib.error
+import urllib.parse
+import urllib.request
+from concurrent.futures import Future
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pandas as pd
+
+from cache_warming import start_cache_warmer
+from price_ranges import new_segment_store, read_price_range
+
+COMPUTE_SERVICE_HOST = "127.0.0.1"
+COMPUTE_SERVICE_PORT = 8502
+
+in_flight = {}
+in_flight_lock = threading.Lock()
+# Price segments shared by every request, so ranges are reused and popular
+# tickers are kept fresh after every close
+analysis_store = new_segment_store()
+
+
+def single_flight(key, compute):
+    # The first caller for a key computes, everyone arriving meanwhile waits on it
+    with in_flight_lock:
+        future = in_flight.get(key)
+        is_leader = future is None
+        if is_leader:
+            future = Future()
+            in_flight[key] = future
+
+    if not is_leader:
+        return future.result()
+
+    try:
+        result = compute()
+        future.set_result(result)
+        return result
+    except Exception as error:
+        future.set_exception(error)
+        raise
+    finally:
+        with in_flight_lock:
+            del in_flight[key]
+
+
+def compute_analysis(ticker, start_date, end_date, indicator_params):
+    # The warmer follows the parameters of the first request
+    start_cache_warmer(analysis_store, indicator_params)
+    prices, indicators = read_price_range(
+        analysis_store, ticker, start_date, end_date, indicator_params
+    )
+
+    # Serialised once, every waiter receives the same bytes
+    return json.dumps(
+        {
+            "prices": json.loads(prices.to_json(orient="split", date_format="iso")),
+            "indicators": json.loads(
+                indicators.to_json(orient="split", date_format="iso")
+            ),
+        }
+    ).encode()
+
+
+class ComputeRequestHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        url = urllib.parse.urlparse(self.path)
+        if url.path != "/analysis":
+            self.send_error(404)
+            return
+
+        query = urllib.parse.parse_qs(url.query)
+        try:
+            ticker = query["ticker"][0].upper()
+            start_date = dt.date.fromisoformat(query["start"][0])
+            end_date = dt.date.fromisoformat(query["end"][0])
+            indicator_params = json.loads(query.get("params", ["{}"])[0])
+        except KeyError as error:
+            self.send_error(400, f"Missing parameter {error}")
+            return
+        except ValueError as error:
+            # Malformed dates and JSON (JSONDecodeError is a ValueError)
+            self.send_error(400, f"Invalid parameter: {error}")
+            return
+        if not isinstance(indicator_params, dict):
+            self.send_error(400, "params must be a JSON object")
+            return
+
+        key = (
+            ticker,
+            start_date,
+            end_date,
+            json.dumps(indicator_params, sort_keys=True),
+        )
+        try:
+            body = single_flight(
+                key,
+                lambda: compute_analysis(
+                    ticker, start_date, end_date, indicator_params
+                ),
+            )
+        except Exception as error:
+            self.send_error(502, str(error))
+            return
+
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+def read_frame(frame_json):
+    frame = pd.read_json(io.StringIO(json.dumps(frame_json)), orient="split")
+    frame.index = pd.to_datetime(frame.index)
+    frame.index.name = "Date"
+    return frame
+
+
+def fetch_analysis(ticker, start_date, end_date, indicator_params, timeout=60):
+    # Returns (prices, indicators) from the warm-up before start_date to end_date,
+    # or None when the service is not running
+    query = urllib.parse.urlencode(
+        {
+            "ticker": ticker,
+            "start": str(start_date),
+            "end": str(end_date),
+            "params": json.dumps(indicator_params),
+        }
+    )
+    url = f"http://{COMPUTE_SERVICE_HOST}:{COMPUTE_SERVICE_PORT}/analysis?{query}"
+    try:
+        with urllib.request.urlopen(url, timeout=timeout) as response:
+            analysis = json.loads(response.read())
+    except (urllib.error.URLError, ConnectionError, TimeoutError):
+        return None
+
+    return read_frame(analysis["prices"]), read_frame(analysis["indicators"])
+
+
+def run_compute_service():
+    server = ThreadingHTTPServer(
+        (COMPUTE_SERVICE_HOST, COMPUTE_SERVICE_PORT), ComputeRequestHandler
+    )
+    print(f"Compute service on http://{COMPUTE_SERVICE_HOST}:{COMPUTE_SERVICE_PORT}")
+    server.serve_forever()
+
+
+if __name__ == "__main__":
+    run_compute_service()
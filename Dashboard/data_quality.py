@@ -0,0 +1,113 @@
+### Price Data Quality
+import numpy as np
+import pandas as pd
+
+# A move larger than this between consecutive valid prices is flagged as a jump
+MAX_JUMP = 0.5
+# Valid prices further apart than this (halts, missing index dates) are a gap
+MAX_GAP_DAYS = 7
+# Share of a window's prices that may fail validation before its MA is left blank
+MISSING_PRICE_TOLERANCE = 0.1
+
+QUALITY_FLAGS = ["not_listed", "missing", "non_positive", "jump", "spike", "gap"]
+
+
+def get_last_valid_rows(is_valid):
+    # Row of the latest valid value at or before each row, -1 when there is none
+    rows = np.where(is_valid, np.arange(is_valid.shape[0])[:, None], -1)
+    return np.maximum.accumulate(rows, axis=0)
+
+
+def get_next_valid_rows(is_valid):
+    # Row of the earliest valid value at or after each row, n when there is none
+    n = is_valid.shape[0]
+    rows = np.where(is_valid, np.arange(n)[:, None], n)
+    return np.minimum.accumulate(rows[::-1], axis=0)[::-1]
+
+
+def take_rows(values, rows):
+    # values[rows[i, j], j], NaN where rows points outside the array
+    is_inside = (rows >= 0) & (rows < values.shape[0])
+    columns = np.arange(values.shape[1])
+    taken = values[np.clip(rows, 0, values.shape[0] - 1), columns]
+    return np.where(is_inside, taken, np.nan)
+
+
+def validate_prices(prices, dates, max_jump=MAX_JUMP, max_gap_days=MAX_GAP_DAYS):
+    # prices is a dates x tickers array, every check runs over the whole matrix
+    prices = np.asarray(prices, dtype=float)
+    is_single_ticker = prices.ndim == 1
+    if is_single_ticker:
+        prices = prices[:, None]
+    n = prices.shape[0]
+
+    is_present = ~np.isnan(prices)
+    with np.errstate(invalid="ignore"):
+        non_positive = is_present & (prices <= 0)
+    is_usable = is_present & ~non_positive
+
+    last_rows = get_last_valid_rows(is_usable)
+    next_rows = get_next_valid_rows(is_usable)
+    is_listed = (last_rows >= 0) & (next_rows < n)
+
+    # Previous and next usable price strictly either side of each row
+    previous_rows = np.vstack([np.full((1, prices.shape[1]), -1), last_rows[:-1]])
+    following_rows = np.vstack([next_rows[1:], np.full((1, prices.shape[1]), n)])
+    previous_prices = take_rows(prices, previous_rows)
+    following_prices = take_rows(prices, following_rows)
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        change_in = np.log(prices / previous_prices)
+        change_out = np.log(following_prices / prices)
+    jump_limit = np.log1p(max_jump)
+    jump = is_usable & (np.abs(change_in) > jump_limit)
+    # A jump straight back on the next price is a bad tick, not a real move
+    spike = jump & (np.abs(change_out) > jump_limit) & (
+        np.sign(change_in) != np.sign(change_out)
+    )
+
+    days = pd.DatetimeIndex(dates).to_numpy().astype("datetime64[D]").astype(np.int64)
+    previous_days = days[np.clip(previous_rows, 0, None)]
+    gap = (
+        is_usable
+        & (previous_rows >= 0)
+        & (days[:, None] - previous_days > max_gap_days)
+    )
+
+    quality = {
+        "not_listed": ~is_listed & ~is_usable,
+        "missing": is_listed & ~is_present,
+        "non_positive": non_positive,
+        "jump": jump,
+        "spike": spike,
+        "gap": gap,
+        "valid": is_usable & ~spike,
+    }
+    if is_single_ticker:
+        quality = {name: mask[:, 0] for name, mask in quality.items()}
+    return quality
+
+
+def summarise_quality(quality, tickers):
+    # Flagged rows per ticker, rows outside the listed lifetime are not counted
+    summary = pd.DataFrame(
+        {flag: quality[flag].sum(axis=0) for flag in QUALITY_FLAGS}, index=tickers
+    )
+    summary.index.name = "Ticker"
+    return summary.drop(columns="not_listed")
+
+
+def clean_price_frame(data, max_jump=MAX_JUMP, max_gap_days=MAX_GAP_DAYS):
+    # Prices that failed validation become NaN, which the rolling kernels skip
+    quality = validate_prices(
+        data.to_numpy(dtype=float), data.index, max_jump, max_gap_days
+    )
+    clean_data = data.where(quality["valid"])
+    return clean_data, summarise_quality(quality, data.columns)
+
+
+def clean_price_column(df, price_column="Adj Close"):
+    # Copy of a single ticker frame with failed prices set to NaN in price_column,
+    # so indicators skip them while the raw prices stay on display
+    clean_prices, _ = clean_price_frame(df[[price_column]])
+    return df.assign(**{price_column: clean_prices[price_column]})
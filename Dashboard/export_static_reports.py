@@ -0,0 +1,151 @@
+### Static Signal Reports for GitHub Pages
+import hashlib
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import matplotlib
+
+matplotlib.use("Agg")
+
+import matplotlib.pyplot as plt
+import pandas as pd
+
+from signal_screener import find_latest_results
+
+REPORTS_DIR = Path(__file__).parent.parent / "reports"
+
+# Bump when the report layout changes so every ticker is rendered again
+REPORT_VERSION = 1
+REPORT_POINTS = 250
+
+
+def get_report_hash(ticker_df):
+    content = ticker_df.to_csv(index=False).encode() + str(REPORT_VERSION).encode()
+    return hashlib.md5(content).hexdigest()
+
+
+def render_ticker_report(ticker, ticker_df, reports_dir):
+    ticker_df = ticker_df.tail(REPORT_POINTS).set_index("Date")
+    ticker_df.index = pd.to_datetime(ticker_df.index)
+    tickers_dir = Path(reports_dir) / "tickers"
+
+    fig, ax = plt.subplots(figsize=(12, 6))
+    ax.plot(ticker_df.index, ticker_df["Price"], label="Price", color="blue")
+    for signal, colour in [("BUY", "green"), ("SELL", "red")]:
+        signal_df = ticker_df.loc[ticker_df["Signal"] == signal]
+        ax.scatter(
+            signal_df.index, signal_df["Price"], color=colour, zorder=5, label=signal
+        )
+    ax.set_title(f"{ticker} Signals", fontsize=16)
+    ax.set_xlabel("Date", fontsize=10)
+    ax.set_ylabel("Price", fontsize=14)
+    ax.legend()
+    ax.grid()
+    fig.tight_layout()
+    fig.savefig(tickers_dir / f"{ticker}.png", dpi=80)
+    plt.close(fig)
+
+    ticker_df.reset_index().to_json(
+        tickers_dir / f"{ticker}.json", orient="records", date_format="iso"
+    )
+
+    table = ticker_df.sort_index(ascending=False).head(30).to_html(na_rep="")
+    with open(tickers_dir / f"{ticker}.html", "w") as report_file:
+        report_file.write(
+            f"""<html>
+<head><meta charset="utf-8" /><title>{ticker} Signals</title></head>
+<body>
+<p><a href="../index.html">All tickers</a></p>
+<h1>{ticker} Signals</h1>
+<img src="{ticker}.png" alt="{ticker} signals chart" />
+<h2>Recent Signal Data</h2>
+{table}
+<p><a href="{ticker}.json">Download data (JSON)</a></p>
+</body>
+</html>
+"""
+        )
+
+    return ticker
+
+
+def render_index(latest, reports_dir, data_date):
+    latest = latest.sort_values(["Signal", "Total_Breach"], ascending=[False, True])
+    latest.to_json(Path(reports_dir) / "signals.json", orient="records")
+
+    rows = "\n".join(
+        f'<tr><td><a href="tickers/{row.Ticker}.html">{row.Ticker}</a></td>'
+        f"<td>{row.Price:.2f}</td><td>{row.Total_Breach}</td><td>{row.Signal}</td></tr>"
+        for row in latest.itertuples()
+    )
+    with open(Path(reports_dir) / "index.html", "w") as index_file:
+        index_file.write(
+            f"""<html>
+<head><meta charset="utf-8" /><title>MA Signals</title></head>
+<body>
+<h1>MA Signals as of {data_date}</h1>
+<p>Not personal investment advice, data is an illustration only and may not be accurate.</p>
+<table border="1">
+<tr><th>Ticker</th><th>Price</th><th>Total Breach</th><th>Signal</th></tr>
+{rows}
+</table>
+<p><a href="signals.json">Download all signals (JSON)</a></p>
+</body>
+</html>
+"""
+        )
+
+
+def export_static_reports(results_path=None, reports_dir=REPORTS_DIR, max_workers=None):
+    results_path = results_path or find_latest_results()
+    if results_path is None:
+        raise SystemExit("No MA results found, run the MA analysis batch first.")
+    results = pd.read_csv(results_path).drop(columns=["Unnamed: 0"], errors="ignore")
+    results["Signal"] = results["Signal"].fillna("")
+    results = results.sort_values(["Ticker", "Date"])
+
+    reports_dir = Path(reports_dir)
+    (reports_dir / "tickers").mkdir(parents=True, exist_ok=True)
+    manifest_path = reports_dir / "manifest.json"
+    manifest = json.loads(manifest_path.read_text()) if manifest_path.exists() else {}
+
+    # Only tickers whose rows changed since the last export are rendered again
+    ticker_frames = {ticker: df for ticker, df in results.groupby("Ticker", sort=False)}
+    report_hashes = {
+        ticker: get_report_hash(df.tail(REPORT_POINTS))
+        for ticker, df in ticker_frames.items()
+    }
+    changed_tickers = [
+        ticker
+        for ticker, report_hash in report_hashes.items()
+        if manifest.get(ticker) != report_hash
+        or not (reports_dir / "tickers" / f"{ticker}.png").exists()
+    ]
+
+    with ProcessPoolExecutor(max_workers=max_workers or os.cpu_count()) as executor:
+        for ticker in executor.map(
+            render_ticker_report,
+            changed_tickers,
+            [ticker_frames[ticker] for ticker in changed_tickers],
+            [reports_dir] * len(changed_tickers),
+        ):
+            manifest[ticker] = report_hashes[ticker]
+
+    # Tickers that left the universe are dropped with their reports
+    for ticker in set(manifest) - set(ticker_frames):
+        del manifest[ticker]
+        for suffix in (".png", ".json", ".html"):
+            (reports_dir / "tickers" / f"{ticker}{suffix}").unlink(missing_ok=True)
+
+    latest = results.groupby("Ticker").tail(1)
+    render_index(latest, reports_dir, latest["Date"].max())
+    manifest_path.write_text(json.dumps(manifest, indent=1))
+
+    print(f"Rendered {len(changed_tickers)} of {len(ticker_frames)} ticker reports")
+    return changed_tickers
+
+
+if __name__ == "__main__":
+    export_static_reports()
@@ -0,0 +1,163 @@
+### UK Income Tax, NI and Student Loan Calculator
+import numpy as np
+
+# Income tax bands apply to taxable income, i.e. pay above the personal allowance.
+# NI thresholds are the monthly PAYE thresholds x 12, with the in-year rate changes
+# of 2022/23 and 2023/24 averaged into a single annual rate.
+TAX_YEARS = {
+    "2021/22": {
+        "personal_allowance": 12570,
+        "allowance_taper_threshold": 100000,
+        "tax_bands": [(0, 0.20), (37700, 0.40), (150000, 0.45)],
+        "ni_primary_threshold": 9564,
+        "ni_upper_earnings_limit": 50268,
+        "ni_main_rate": 0.12,
+        "ni_upper_rate": 0.02,
+        "student_loan_thresholds": {
+            "Plan 1": 19895,
+            "Plan 2": 27295,
+            "Plan 4": 25000,
+            "Postgraduate": 21000,
+        },
+    },
+    "2022/23": {
+        "personal_allowance": 12570,
+        "allowance_taper_threshold": 100000,
+        "tax_bands": [(0, 0.20), (37700, 0.40), (150000, 0.45)],
+        "ni_primary_threshold": 11908,
+        "ni_upper_earnings_limit": 50268,
+        "ni_main_rate": 0.1273,
+        "ni_upper_rate": 0.0273,
+        "student_loan_thresholds": {
+            "Plan 1": 20195,
+            "Plan 2": 27295,
+            "Plan 4": 25375,
+            "Postgraduate": 21000,
+        },
+    },
+    "2023/24": {
+        "personal_allowance": 12570,
+        "allowance_taper_threshold": 100000,
+        "tax_bands": [(0, 0.20), (37700, 0.40), (125140, 0.45)],
+        "ni_primary_threshold": 12576,
+        "ni_upper_earnings_limit": 50268,
+        "ni_main_rate": 0.115,
+        "ni_upper_rate": 0.02,
+        "student_loan_thresholds": {
+            "Plan 1": 22015,
+            "Plan 2": 27295,
+            "Plan 4": 27660,
+            "Postgraduate": 21000,
+        },
+    },
+    "2024/25": {
+        "personal_allowance": 12570,
+        "allowance_taper_threshold": 100000,
+        "tax_bands": [(0, 0.20), (37700, 0.40), (125140, 0.45)],
+        "ni_primary_threshold": 12576,
+        "ni_upper_earnings_limit": 50268,
+        "ni_main_rate": 0.08,
+        "ni_upper_rate": 0.02,
+        "student_loan_thresholds": {
+            "Plan 1": 24990,
+            "Plan 2": 27295,
+            "Plan 4": 31395,
+            "Postgraduate": 21000,
+        },
+    },
+    "2025/26": {
+        "personal_allowance": 12570,
+        "allowance_taper_threshold": 100000,
+        "tax_bands": [(0, 0.20), (37700, 0.40), (125140, 0.45)],
+        "ni_primary_threshold": 12576,
+        "ni_upper_earnings_limit": 50268,
+        "ni_main_rate": 0.08,
+        "ni_upper_rate": 0.02,
+        "student_loan_thresholds": {
+            "Plan 1": 26065,
+            "Plan 2": 28470,
+            "Plan 4": 32745,
+            "Postgraduate": 21000,
+        },
+    },
+}
+STUDENT_LOAN_RATES = {
+    "Plan 1": 0.09,
+    "Plan 2": 0.09,
+    "Plan 4": 0.09,
+    "Postgraduate": 0.06,
+}
+UNDERGRADUATE_PLANS = ("Plan 1", "Plan 2", "Plan 4")
+
+
+def get_personal_allowance(pay, rules):
+    # £1 of allowance is lost for every £2 earned over the taper threshold
+    taper = np.maximum(pay - rules["allowance_taper_threshold"], 0) / 2
+    return np.maximum(rules["personal_allowance"] - taper, 0)
+
+
+def get_income_tax(pay, rules):
+    taxable = np.maximum(pay - get_personal_allowance(pay, rules), 0)
+    lowers = [lower for lower, _ in rules["tax_bands"]]
+    uppers = lowers[1:] + [np.inf]
+
+    income_tax = np.zeros_like(taxable)
+    for (lower, rate), upper in zip(rules["tax_bands"], uppers):
+        income_tax += rate * np.clip(taxable - lower, 0, upper - lower)
+    return income_tax
+
+
+def get_national_insurance(pay, rules):
+    threshold = rules["ni_primary_threshold"]
+    limit = rules["ni_upper_earnings_limit"]
+    return rules["ni_main_rate"] * np.clip(pay - threshold, 0, limit - threshold) + (
+        rules["ni_upper_rate"] * np.maximum(pay - limit, 0)
+    )
+
+
+def get_student_loan(pay, rules, student_loan_plans):
+    thresholds = rules["student_loan_thresholds"]
+    # Borrowers on several undergraduate plans repay one 9% above the lowest of
+    # their thresholds, which HMRC then splits between the plans
+    undergraduate_plans = [
+        plan for plan in student_loan_plans if plan in UNDERGRADUATE_PLANS
+    ]
+    charged_plans = [
+        plan for plan in student_loan_plans if plan not in UNDERGRADUATE_PLANS
+    ]
+    if undergraduate_plans:
+        charged_plans.append(min(undergraduate_plans, key=thresholds.get))
+
+    # A Postgraduate loan is repaid on top of any undergraduate plan
+    student_loan = np.zeros_like(pay)
+    for plan in charged_plans:
+        student_loan += STUDENT_LOAN_RATES[plan] * np.maximum(pay - thresholds[plan], 0)
+    return student_loan
+
+
+def calculate_take_home(
+    gross, tax_year="2021/22", pension_pct=0.0, student_loan_plans=()
+):
+    # gross and pension_pct broadcast against each other, so a salary grid can be
+    # swept over several pension rates at once, e.g. gross[:, None], pcts[None, :]
+    rules = TAX_YEARS[tax_year]
+    gross, pension_pct = np.broadcast_arrays(
+        np.asarray(gross, dtype=float), np.asarray(pension_pct, dtype=float)
+    )
+
+    # Pension contributions are taken as salary sacrifice, before tax and NI
+    pension = gross * pension_pct / 100
+    pay = gross - pension
+
+    income_tax = get_income_tax(pay, rules)
+    national_insurance = get_national_insurance(pay, rules)
+    student_loan = get_student_loan(pay, rules, student_loan_plans)
+
+    return {
+        "Gross Income": gross,
+        "Pension": pension,
+        "Income Tax": income_tax,
+        "National Insurance": national_insurance,
+        "Student Loan": student_loan,
+        "Net Income": pay - income_tax - national_insurance - student_loan,
+    }
@@ -0,0 +1,229 @@
+### Indicator Kernels
+import math
+
+import numpy as np
+import pandas as pd
+
+
+def prefix_sums(values):
+    # Running sums with a leading zero row, NaNs contribute nothing to the sum
+    sums = np.zeros((values.shape[0] + 1,) + values.shape[1:])
+    np.nancumsum(values, axis=0, out=sums[1:])
+    return sums
+
+
+def window_sums(sums, window):
+    # The first window - 1 rows sum over the shorter history that is available
+    out = sums[1:] - sums[0]
+    if window <= out.shape[0]:
+        out[window - 1 :] = sums[window:] - sums[:-window]
+    return out
+
+
+def get_has_periods(counts, window, min_periods, missing_tolerance):
+    if missing_tolerance is None:
+        return counts >= min(min_periods or window, window)
+    # A full window of rows is needed, of which a small share may be NaN prices
+    has_periods = counts >= window - math.ceil(window * missing_tolerance)
+    has_periods[: window - 1] = False
+    return has_periods
+
+
+def compute_indicators(
+    prices,
+    volume=None,
+    sma_windows=(),
+    ema_spans=(),
+    rsi_windows=(),
+    bollinger_windows=(),
+    bollinger_width=2,
+    macd_params=None,
+    vwma_windows=(),
+    min_periods=None,
+    missing_tolerance=None,
+):
+    # prices is a dates x tickers array (a single ticker may be passed as 1-D).
+    # Window indicators need min_periods valid prices in the window, a full window
+    # by default like rolling(window).mean(); NaN prices are skipped, not zeroed.
+    # missing_tolerance instead asks for a full window with at most that fraction
+    # of its prices missing.
+    prices = np.asarray(prices, dtype=float)
+    is_single_ticker = prices.ndim == 1
+    if is_single_ticker:
+        prices = prices[:, None]
+        volume = None if volume is None else np.asarray(volume, dtype=float)[:, None]
+
+    indicators = {}
+    is_valid = ~np.isnan(prices)
+
+    # Window indicators: every window reads from the same set of prefix sums
+    rolling_windows = sorted(set(sma_windows) | set(bollinger_windows))
+    if rolling_windows:
+        price_sums = prefix_sums(prices)
+        count_sums = prefix_sums(is_valid.astype(float))
+        square_sums = prefix_sums(prices**2) if bollinger_windows else None
+
+        for window in rolling_windows:
+            counts = window_sums(count_sums, window)
+            has_periods = get_has_periods(
+                counts, window, min_periods, missing_tolerance
+            )
+            with np.errstate(divide="ignore", invalid="ignore"):
+                mean = np.where(
+                    has_periods, window_sums(price_sums, window) / counts, np.nan
+                )
+
+            if window in sma_windows:
+                indicators[f"SMA_{window}"] = mean
+
+            if window in bollinger_windows:
+                with np.errstate(divide="ignore", invalid="ignore"):
+                    variance = window_sums(square_sums, window) / counts - mean**2
+                    std = np.sqrt(
+                        np.clip(variance, 0, None) * counts / (counts - 1)
+                    )
+                indicators[f"BB_MID_{window}"] = mean
+                indicators[f"BB_UPPER_{window}"] = mean + bollinger_width * std
+                indicators[f"BB_LOWER_{window}"] = mean - bollinger_width * std
+
+    if vwma_windows and volume is not None:
+        volume = np.asarray(volume, dtype=float)
+        value_sums = prefix_sums(prices * volume)
+        volume_sums = prefix_sums(np.where(is_valid, volume, np.nan))
+        count_sums = prefix_sums((is_valid & ~np.isnan(volume)).astype(float))
+
+        for window in vwma_windows:
+            counts = window_sums(count_sums, window)
+            has_periods = get_has_periods(
+                counts, window, min_periods, missing_tolerance
+            )
+            with np.errstate(divide="ignore", invalid="ignore"):
+                vwma = window_sums(value_sums, window) / window_sums(
+                    volume_sums, window
+                )
+            indicators[f"VWMA_{window}"] = np.where(has_periods, vwma, np.nan)
+
+    # Recursive indicators: all EMA-style states advance together in one time loop
+    state_names = [f"EMA_{span}" for span in ema_spans]
+    state_alphas = [2 / (span + 1) for span in ema_spans]
+    state_sources = [0] * len(ema_spans)
+
+    for window in rsi_windows:
+        state_names += [f"RSI_GAIN_{window}", f"RSI_LOSS_{window}"]
+        state_alphas += [1 / window, 1 / window]
+        state_sources += [1, 2]
+
+    if macd_params is not None:
+        fast_span, slow_span, signal_span = macd_params
+        state_names += ["MACD_FAST", "MACD_SLOW"]
+        state_alphas += [2 / (fast_span + 1), 2 / (slow_span + 1)]
+        state_sources += [0, 0]
+        signal_alpha = 2 / (signal_span + 1)
+
+    if state_names:
+        changes = np.diff(prices, axis=0, prepend=np.nan)
+        sources = np.stack(
+            [prices, np.clip(changes, 0, None), np.clip(-changes, 0, None)], axis=1
+        )
+        alphas = np.asarray(state_alphas)[:, None]
+        state_sources = np.asarray(state_sources)
+
+        states = np.full((prices.shape[0], len(state_names), prices.shape[1]), np.nan)
+        state = np.full((len(state_names), prices.shape[1]), np.nan)
+        macd_signal = np.full((prices.shape[0], prices.shape[1]), np.nan)
+        signal_state = np.full(prices.shape[1], np.nan)
+
+        for row in range(prices.shape[0]):
+            x = sources[row, state_sources]
+            updated = np.where(np.isnan(state), x, alphas * x + (1 - alphas) * state)
+            state = np.where(np.isnan(x), state, updated)
+            states[row] = state
+
+            if macd_params is not None:
+                macd = state[-2] - state[-1]
+                updated = np.where(
+                    np.isnan(signal_state),
+                    macd,
+                    signal_alpha * macd + (1 - signal_alpha) * signal_state,
+                )
+                signal_state = np.where(np.isnan(macd), signal_state, updated)
+                macd_signal[row] = signal_state
+
+        for position, name in enumerate(state_names):
+            if name.startswith("EMA_"):
+                indicators[name] = states[:, position]
+
+        for window in rsi_windows:
+            gain = states[:, state_names.index(f"RSI_GAIN_{window}")]
+            loss = states[:, state_names.index(f"RSI_LOSS_{window}")]
+            with np.errstate(divide="ignore", invalid="ignore"):
+                rsi = 100 - 100 / (1 + gain / loss)
+            indicators[f"RSI_{window}"] = np.where(
+                (loss == 0) & ~np.isnan(gain), 100.0, rsi
+            )
+
+        if macd_params is not None:
+            macd = states[:, -2] - states[:, -1]
+            indicators["MACD"] = macd
+            indicators["MACD_SIGNAL"] = macd_signal
+            indicators["MACD_HIST"] = macd - macd_signal
+
+    if is_single_ticker:
+        indicators = {name: values[:, 0] for name, values in indicators.items()}
+    return indicators
+
+
+def indicator_frame(df, price_column="Adj Close", volume_column="Volume", **params):
+    volume = df[volume_column].to_numpy() if volume_column in df.columns else None
+    indicators = compute_indicators(
+        df[price_column].to_numpy(), volume=volume, **params
+    )
+    return pd.DataFrame(indicators, index=df.index)
+
+
+def as_nanoseconds(timestamps):
+    timestamps = pd.DatetimeIndex(timestamps)
+    if timestamps.tz is not None:
+        timestamps = timestamps.tz_convert(None)
+    return timestamps.as_unit("ns").asi8
+
+
+def compute_time_indicators(timestamps, prices, sma_windows=(), change_periods=()):
+    # Windows are time offsets ("1h", "5D") rather than row counts, for intraday bars
+    times = as_nanoseconds(timestamps)
+    prices = np.asarray(prices, dtype=float)
+    is_single_ticker = prices.ndim == 1
+    if is_single_ticker:
+        prices = prices[:, None]
+
+    indicators = {}
+    rows = np.arange(len(times))
+
+    if sma_windows:
+        price_sums = prefix_sums(prices)
+        count_sums = prefix_sums((~np.isnan(prices)).astype(float))
+
+        for window in sma_windows:
+            window_ns = pd.Timedelta(window).value
+            starts = np.searchsorted(times, times - window_ns, side="right")
+            counts = count_sums[rows + 1] - count_sums[starts]
+            with np.errstate(divide="ignore", invalid="ignore"):
+                mean = (price_sums[rows + 1] - price_sums[starts]) / counts
+
+            # Rows without a full window of history behind them stay NaN
+            has_history = (times - window_ns >= times[0])[:, None]
+            indicators[f"SMA_{window}"] = np.where(
+                has_history & (counts > 0), mean, np.nan
+            )
+
+    for period in change_periods:
+        period_ns = pd.Timedelta(period).value
+        previous = np.searchsorted(times, times - period_ns, side="right") - 1
+        previous_prices = np.where(
+            (previous >= 0)[:, None], prices[np.clip(previous, 0, None)], np.nan
+        )
+        indicators[f"CHANGE_{period}"] = (prices - previous_prices) / previous_prices
+
+    if is_single_ticker:
+        indicators = {name: values[:, 0] for name, values in indicators.items()}
+    return indicators
@@ -0,0 +1,89 @@
+### Intraday Bar Store
+import datetime as dt
+from pathlib import Path
+
+import pandas as pd
+
+from yahoo_downloads import download_yahoo
+
+INTRADAY_STORE_DIR = Path(__file__).parent / "Data" / "Intraday"
+
+# Longest history Yahoo serves for each bar interval
+INTRADAY_INTERVALS = {"1m": "7d", "5m": "60d", "15m": "60d", "1h": "730d"}
+
+
+def get_partition_dir(ticker, interval, store_dir=INTRADAY_STORE_DIR):
+    return Path(store_dir) / interval / ticker
+
+
+def update_intraday_store(ticker, interval, store_dir=INTRADAY_STORE_DIR):
+    partition_dir = get_partition_dir(ticker, interval, store_dir)
+    partition_dir.mkdir(parents=True, exist_ok=True)
+
+    # Only fetch the days after the newest stored partition (re-fetching that day)
+    stored_days = sorted(path.stem for path in partition_dir.glob("*.parquet"))
+    if stored_days:
+        bars = download_yahoo(
+            ticker,
+            start=stored_days[-1],
+            end=dt.datetime.now().date() + dt.timedelta(days=1),
+            interval=interval,
+        )
+    else:
+        bars = download_yahoo(
+            ticker, period=INTRADAY_INTERVALS[interval], interval=interval
+        )
+
+    if bars.empty:
+        return 0
+
+    # One parquet partition per trading day keeps every write and read small
+    for day, day_bars in bars.groupby(bars.index.date):
+        day_bars.to_parquet(partition_dir / f"{day}.parquet")
+
+    return len(bars)
+
+
+def list_partitions(
+    ticker, interval, start=None, end=None, store_dir=INTRADAY_STORE_DIR
+):
+    partition_dir = get_partition_dir(ticker, interval, store_dir)
+    partitions = sorted(partition_dir.glob("*.parquet"))
+    if start is not None:
+        partitions = [path for path in partitions if path.stem >= str(start)]
+    if end is not None:
+        partitions = [path for path in partitions if path.stem <= str(end)]
+    return partitions
+
+
+def read_intraday(
+    ticker, interval, start=None, end=None, store_dir=INTRADAY_STORE_DIR
+):
+    partitions = list_partitions(ticker, interval, start, end, store_dir)
+    if not partitions:
+        return pd.DataFrame()
+    return pd.concat([pd.read_parquet(path) for path in partitions]).sort_index()
+
+
+def iter_intraday_chunks(
+    ticker, interval, warmup, chunk_days=5, start=None, store_dir=INTRADAY_STORE_DIR
+):
+    # Yields (frame, first_new_bar), the frame carries `warmup` of history in
+    # front of the new bars so time-based windows are complete at every new bar.
+    # Partitions before `start` are not read
+    partitions = list_partitions(ticker, interval, start=start, store_dir=store_dir)
+    warmup = pd.Timedelta(warmup)
+    carry = None
+
+    for position in range(0, len(partitions), chunk_days):
+        chunk_partitions = partitions[position : position + chunk_days]
+        chunk = pd.concat([pd.read_parquet(path) for path in chunk_partitions])
+        chunk = chunk.sort_index()
+        frame = chunk if carry is None else pd.concat([carry, chunk])
+
+        yield frame, chunk.index[0]
+
+        # Keep one bar before the warm-up boundary so the next chunk's windows are
+        # anchored even across overnight and weekend gaps
+        first_carry = frame.index.searchsorted(frame.index[-1] - warmup, side="right")
+        carry = frame.iloc[max(first_carry - 1, 0) :]
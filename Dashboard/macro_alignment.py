@@ -0,0 +1,104 @@
+### Macro to Market Alignment
+import datetime as dt
+import hashlib
+from pathlib import Path
+
+import pandas as pd
+
+from yahoo_downloads import download_yahoo
+
+ALIGNMENT_CACHE_DIR = Path(__file__).parent / "Data" / "Alignment Cache"
+ALIGNMENT_PANELS = ["daily", "monthly"]
+
+
+def read_prices(tickers, start_date):
+    prices = download_yahoo(
+        tickers,
+        start=start_date,
+        end=dt.datetime.now().date() + dt.timedelta(days=1),
+    )["Adj Close"]
+
+    # Single tickers come back as a Series, keep everything as a wide frame
+    if isinstance(prices, pd.Series):
+        prices = prices.to_frame(name=tickers[0])
+    prices.index.name = "Date"
+    return prices.sort_index()
+
+
+def build_cpi_index(cpi):
+    # Chain the 1-month rates into an index so prices can be deflated
+    cpi = cpi.sort_values("Date").reset_index(drop=True)
+    cpi["CPI Index"] = (1 + cpi["CPI 1-Month rate"] / 100).cumprod()
+    cpi["CPI Index"] = cpi["CPI Index"] / cpi["CPI Index"].iloc[0] * 100
+    return cpi
+
+
+def build_alignment_panels(prices, cpi):
+    cpi = build_cpi_index(cpi)
+
+    # Daily panel: as-of join of the latest published month onto every price row
+    daily = prices.stack().rename("Price").reset_index()
+    daily.columns = ["Date", "Ticker", "Price"]
+    daily = pd.merge_asof(
+        daily.sort_values("Date"),
+        cpi,
+        on="Date",
+        direction="backward",
+    )
+    daily["Real Price"] = daily["Price"] / daily["CPI Index"] * 100
+    daily = daily.sort_values(["Ticker", "Date"]).reset_index(drop=True)
+
+    # Monthly panel: month-start aligned closes joined 1:1 onto the CPI months
+    monthly_prices = prices.resample("MS").last()
+    nominal_returns = monthly_prices.pct_change() * 100
+
+    monthly = pd.concat(
+        {"Price": monthly_prices, "Nominal Return": nominal_returns}, axis=1
+    ).stack(future_stack=True)
+    monthly.index.names = ["Date", "Ticker"]
+    monthly = monthly.reset_index().merge(cpi, on="Date", how="left")
+
+    monthly["Real Return"] = (
+        (1 + monthly["Nominal Return"] / 100) / (1 + monthly["CPI 1-Month rate"] / 100)
+        - 1
+    ) * 100
+    monthly = monthly.sort_values(["Ticker", "Date"]).reset_index(drop=True)
+
+    return {"daily": daily, "monthly": monthly}
+
+
+def get_refresh_key(tickers, start_date, cpi):
+    # Prices refresh once a day and CPI once a month, so the pair identifies a refresh
+    key = "|".join(
+        [
+            ",".join(sorted(tickers)),
+            str(start_date),
+            str(dt.datetime.now().date()),
+            str(cpi["Date"].max().date()),
+        ]
+    )
+    return hashlib.md5(key.encode()).hexdigest()[:16]
+
+
+def load_alignment_panels(tickers, start_date, cpi, cache_dir=ALIGNMENT_CACHE_DIR):
+    refresh_key = get_refresh_key(tickers, start_date, cpi)
+    panel_paths = {
+        panel: Path(cache_dir) / f"{refresh_key}_{panel}.pkl"
+        for panel in ALIGNMENT_PANELS
+    }
+
+    # Reuse the panels materialised for this refresh if they already exist
+    if all(path.exists() for path in panel_paths.values()):
+        return {panel: pd.read_pickle(path) for panel, path in panel_paths.items()}
+
+    panels = build_alignment_panels(read_prices(tickers, start_date), cpi)
+
+    Path(cache_dir).mkdir(parents=True, exist_ok=True)
+    for old_path in Path(cache_dir).glob("*.pkl"):
+        modified = dt.date.fromtimestamp(old_path.stat().st_mtime)
+        if modified < dt.datetime.now().date():
+            old_path.unlink()
+    for panel, path in panel_paths.items():
+        panels[panel].to_pickle(path)
+
+    return panels
@@ -7,6 +7,9 @@ import plotly.express as px
 import plotly.graph_objects as go
 import streamlit as st
 
+from macro_alignment import load_alignment_panels
+from profiling import profiled
+
 # from Tools.streamlit_tools import plot_metric
 
 
@@ -38,6 +41,12 @@ def run_analysis():
     return df
 
 
+@st.cache_data(ttl=dt.timedelta(hours=1), show_spinner="Aligning prices to CPI...")
+def get_alignment_panels(tickers, start_date, cpi):
+    return load_alignment_panels(tickers, start_date, cpi)
+
+
+@profiled
 def run_dashboard():
     st.set_page_config(layout="wide", page_icon="📊")
 
@@ -80,6 +89,42 @@ def run_dashboard():
             hide_index=True,
         )
 
+    st.subheader("CPI vs Stock Prices")
+    tickers = st.multiselect(
+        "Tickers", ["AMZN", "AAPL", "MSFT", "GOOGL", "NVDA"], default=["AMZN"]
+    )
+    if tickers:
+        panels = get_alignment_panels(
+            tuple(sorted(tickers)), df["Date"].min().date() - dt.timedelta(days=31), df
+        )
+        monthly = panels["monthly"].dropna(subset=["Real Return"])
+
+        col3, col4 = st.columns(2)
+
+        with col3:
+            st.markdown("Monthly Real Return (%)")
+            fig3 = px.bar(
+                monthly, x="Date", y="Real Return", color="Ticker", barmode="group"
+            )
+            st.plotly_chart(fig3, use_container_width=True)
+
+        with col4:
+            st.markdown("Real Price (CPI deflated)")
+            fig4 = px.line(
+                panels["daily"].dropna(subset=["Real Price"]),
+                x="Date",
+                y="Real Price",
+                color="Ticker",
+            )
+            st.plotly_chart(fig4, use_container_width=True)
+
+        with st.expander("Monthly Alignment Data"):
+            st.dataframe(
+                monthly.sort_values(["Date", "Ticker"], ascending=[False, True]),
+                column_config={"Date": st.column_config.DateColumn(format="MMM YYYY")},
+                hide_index=True,
+            )
+
 
 if __name__ == "__main__":
     run_dashboard()
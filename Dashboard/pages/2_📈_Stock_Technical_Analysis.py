@@ -7,19 +7,112 @@ import pandas as pd
 import plotly.express as px
 import plotly.graph_objects as go
 import streamlit as st
-import yfinance as yf
+
+from cache_warming import start_cache_warmer
+from comparison import (
+    COMPARE_TICKERS,
+    build_comparison,
+    plot_comparison,
+    read_comparison_prices,
+    summarise_comparison,
+)
+from compute_service import fetch_analysis
+from data_quality import MISSING_PRICE_TOLERANCE, clean_price_column
+from indicators import compute_time_indicators, indicator_frame
+from intraday import INTRADAY_INTERVALS, read_intraday, update_intraday_store
+from price_cube import (
+    PRICE_FIELDS,
+    get_cube_indicators,
+    get_field_view,
+    get_ticker_frame,
+    load_price_cube,
+)
+from price_ranges import (
+    covers_range,
+    get_warmup_start,
+    is_refreshing,
+    new_segment_store,
+    read_price_range,
+)
+from price_store import get_view_bars, get_view_resolution
+from profiling import profiled
+
+MA_WINDOWS = (5, 30, 60, 90, 180)
+SIGNAL_MA_WINDOWS = (5, 30, 90, 180)
+INDICATOR_PARAMS = dict(
+    rsi_windows=(14,),
+    bollinger_windows=(20,),
+    macd_params=(12, 26, 9),
+    vwma_windows=(20,),
+    # Prices that failed validation are skipped rather than blanking whole windows
+    missing_tolerance=MISSING_PRICE_TOLERANCE,
+)
+DAILY_INDICATOR_PARAMS = dict(INDICATOR_PARAMS, sma_windows=MA_WINDOWS)
+
+# Intraday windows are time spans rather than a number of bars
+INTRADAY_MA_WINDOWS = ("1h", "4h", "1D", "2D", "5D")
+INTRADAY_SIGNAL_MA_WINDOWS = ("1h", "4h", "2D", "5D")
+INTRADAY_CHANGE_PERIOD = "1D"
 
 # from Tools.streamlit_tools import plot_metric
 
 
-def read_data(ticker, start_of_period="2020-01-01"):
-    return yf.download(
-        ticker,
-        start=start_of_period,
-        end=dt.datetime.now().date() + dt.timedelta(days=1),
+# Downloaded ranges per ticker, reused by every session as the slider moves. The
+# default and most viewed tickers are kept warm after every close
+@st.cache_resource
+def get_price_segments():
+    return start_cache_warmer(new_segment_store(), DAILY_INDICATOR_PARAMS)
+
+
+# One memory-mapped cube per server process, every session reads views of it
+@st.cache_resource(ttl=dt.timedelta(hours=1))
+def get_price_cube():
+    return load_price_cube()
+
+
+def get_comparison_prices(
+    price_cube, price_segments, tickers, date_range, loaded_prices
+):
+    # Straight from the shared cube when it holds every ticker, else the cube's
+    # tickers are passed on with the loaded ones and the rest are read together
+    if price_cube is not None and all(
+        ticker in price_cube["ticker_columns"] for ticker in tickers
+    ):
+        columns = [price_cube["ticker_columns"][ticker] for ticker in tickers]
+        adj_close = get_field_view(price_cube, "Adj Close")[:, columns]
+        return pd.DataFrame(adj_close, index=price_cube["dates"], columns=tickers)
+    if price_cube is not None:
+        warmup_start = get_warmup_start(date_range[0])
+        cube_prices = {
+            ticker: get_ticker_frame(price_cube, ticker, warmup_start)
+            for ticker in tickers
+            if ticker in price_cube["ticker_columns"]
+        }
+        loaded_prices = {**cube_prices, **loaded_prices}
+    return read_comparison_prices(
+        price_segments, tickers, date_range, DAILY_INDICATOR_PARAMS, loaded_prices
     )
 
 
+# New bars are fetched at most once a minute per ticker and interval, not on every
+# rerun, the partitions on disk serve everything in between
+@st.cache_data(ttl=dt.timedelta(minutes=1), show_spinner=False)
+def refresh_intraday_store(ticker, interval):
+    return update_intraday_store(ticker, interval)
+
+
+def read_intraday_data(ticker, interval, date_range):
+    refresh_intraday_store(ticker, interval)
+
+    # Only the partitions in the selected range (plus the longest window) are read
+    warmup_start = date_range[0] - dt.timedelta(days=7)
+    df = read_intraday(ticker, interval, start=warmup_start, end=date_range[1])
+    if len(df):
+        df.index = df.index.tz_localize(None)
+    return df
+
+
+@profiled
 def run_dashboard():
     st.set_page_config(layout="wide", page_icon="📈")
 
@@ -27,14 +120,21 @@ def run_dashboard():
     with st.sidebar:
         st.subheader("Parameters:")
         ticker = st.text_input("Ticker", "AMZN")
+        interval = st.selectbox("Bar interval", ["1d"] + list(INTRADAY_INTERVALS))
         start_of_period = dt.date(2020, 1, 1)
+        # Intraday bars only go back as far as Yahoo serves them for the interval
+        if interval == "1d":
+            first_date = start_of_period
+        else:
+            coverage_days = int(INTRADAY_INTERVALS[interval].rstrip("d"))
+            first_date = dt.datetime.now().date() - dt.timedelta(days=coverage_days)
 
         date_range = st.slider(
             "Select your date range",
-            min_value=start_of_period,
+            min_value=first_date,
             max_value=dt.datetime.now().date() + dt.timedelta(days=1),
             value=(
-                dt.date(2020, 1, 1),
+                first_date,
                 dt.datetime.now().date() + dt.timedelta(days=1),
             ),
             format="DD.MM.YYYY",
@@ -50,28 +150,115 @@ def run_dashboard():
         """
     )
 
-    df = read_data(ticker, start_of_period)
+    indicator_params = dict(
+        INDICATOR_PARAMS, sma_windows=MA_WINDOWS if interval == "1d" else ()
+    )
+    indicators = None
+    # Daily prices with their warm-up, reused by the comparison
+    loaded_prices = {}
+
+    price_cube = get_price_cube()
+    price_segments = get_price_segments()
+    with st.sidebar:
+        compare_options = sorted(
+            set(COMPARE_TICKERS) | set(price_cube["tickers"] if price_cube else [])
+        )
+        compare_tickers = st.multiselect("Compare with", compare_options)
+
+    # Daily views only load the selected range plus the warm-up of the longest MA
+    warmup_start = get_warmup_start(date_range[0])
+    if interval != "1d":
+        df = read_intraday_data(ticker, interval, date_range)
+    elif price_cube is not None and ticker in price_cube["ticker_columns"]:
+        df = get_ticker_frame(price_cube, ticker, warmup_start)[PRICE_FIELDS]
+        indicators = get_cube_indicators(price_cube, ticker, df, indicator_params)
+    else:
+        # Ranges the process's segments already hold (e.g. warmed tickers) are served
+        # from them. Otherwise the local compute service coalesces identical
+        # requests and reads through its own segments
+        with price_segments["lock"]:
+            segment = price_segments["segments"].get(ticker)
+        analysis = None
+        if not covers_range(segment, warmup_start, indicator_params):
+            analysis = fetch_analysis(
+                ticker, date_range[0], date_range[1], indicator_params
+            )
+        if analysis is None:
+            analysis = read_price_range(
+                price_segments,
+                ticker,
+                date_range[0],
+                date_range[1],
+                indicator_params,
+            )
+        df, indicators = analysis
+    if df.empty:
+        st.warning(f"No {interval} prices for {ticker} in the selected date range.")
+        return
+
     # Run Analysis
-    df = df.sort_index(inplace=False)
+    if not df.index.is_monotonic_increasing:
+        df = df.sort_index(inplace=False)
+
+    # All MAs and extra indicators come out of one fused kernel pass
+    if indicators is None:
+        indicators = indicator_frame(clean_price_column(df), **indicator_params)
+    if interval == "1d":
+        df["Monthly_Day_change_pc"] = (
+            df["Adj Close"] - df["Adj Close"].shift(30)
+        ) / df["Adj Close"].shift(30)
+
+        loaded_prices[ticker.upper()] = df
+        in_range = slice(pd.Timestamp(date_range[0]), pd.Timestamp(date_range[1]))
+    else:
+        time_indicators = compute_time_indicators(
+            df.index,
+            clean_price_column(df)["Adj Close"].to_numpy(),
+            sma_windows=INTRADAY_MA_WINDOWS,
+            change_periods=(INTRADAY_CHANGE_PERIOD,),
+        )
+        indicators = indicators.assign(**time_indicators)
+        df["Monthly_Day_change_pc"] = indicators[f"CHANGE_{INTRADAY_CHANGE_PERIOD}"]
+        # Date strings slice whole days, so the last selected day is kept
+        in_range = slice(str(date_range[0]), str(date_range[1]))
+
+    # Every window has its warm-up now, so only the selected range is kept
+    df, indicators = df.loc[in_range].copy(), indicators.loc[in_range]
+    if df.empty:
+        st.warning(f"No {interval} prices for {ticker} in the selected date range.")
+        return
     last_price = round(df.tail(1)["Adj Close"].values[0], 2)
     last_date = str(df.tail(1).index.values[0])[0:10]
+    if is_refreshing(price_segments, ticker):
+        st.caption("Newer prices are loading in the background, rerun to see them.")
 
-    # create 2 tabs
-    analysis_tab, signals_tab = st.tabs(["Analysis", "Signals"])
+    # Long daily ranges are charted as weekly or monthly bars, signals stay daily
+    chart_resolution = "1d"
+    if interval == "1d":
+        chart_resolution = get_view_resolution(date_range[0], date_range[1])
+
+    # create 2 tabs, plus a comparison tab when other tickers are selected
+    tab_names = ["Analysis", "Signals"] + (["Compare"] if compare_tickers else [])
+    analysis_tab, signals_tab, *compare_tab = st.tabs(tab_names)
 
     with analysis_tab:
         st.title(f"{ticker} Price vs Volume Trended")
+        chart_bars = df
+        if chart_resolution != "1d":
+            chart_bars = get_view_bars(
+                ticker.upper(), df[["Adj Close", "Volume"]], chart_resolution
+            )
 
         # Calculating the average values for "Adj Close" and "Volume"
-        avg_adj_close = df["Adj Close"].mean()
-        avg_volume = df["Volume"].mean()
+        avg_adj_close = chart_bars["Adj Close"].mean()
+        avg_volume = chart_bars["Volume"].mean()
 
         # Recreating the plot with average lines
         fig, ax1 = plt.subplots(figsize=(12, 6))
 
         # "Adj Close" on the primary axis
         ax1.plot(
-            df["Adj Close"],
+            chart_bars["Adj Close"],
             label="Adj Close",
             color="blue",
         )
@@ -88,8 +275,8 @@ def run_dashboard():
         # "Volume" as bars on the secondary axis
         ax2 = ax1.twinx()
         ax2.bar(
-            x=df.index,
-            height=df["Volume"],
+            x=chart_bars.index,
+            height=chart_bars["Volume"],
             label="Volume",
             color="green",
             alpha=0.6,
@@ -118,24 +305,17 @@ def run_dashboard():
             )
 
     with signals_tab:
-        df["MA_5"] = df["Adj Close"].rolling(window=5).mean()
-        df["Distance from MA_5"] = (df["Adj Close"] - df["MA_5"]) / df["MA_5"]
-
-        df["MA_30"] = df["Adj Close"].rolling(window=30).mean()
-        df["Distance from MA_30"] = (df["Adj Close"] - df["MA_30"]) / df["MA_30"]
-
-        df["MA_60"] = df["Adj Close"].rolling(window=60).mean()
-        df["Distance from MA_60"] = (df["Adj Close"] - df["MA_60"]) / df["MA_60"]
-
-        df["MA_90"] = df["Adj Close"].rolling(window=90).mean()
-        df["Distance from MA_90"] = (df["Adj Close"] - df["MA_90"]) / df["MA_90"]
+        if interval == "1d":
+            ma_windows, signal_ma_windows = MA_WINDOWS, SIGNAL_MA_WINDOWS
+        else:
+            ma_windows = INTRADAY_MA_WINDOWS
+            signal_ma_windows = INTRADAY_SIGNAL_MA_WINDOWS
 
-        df["MA_180"] = df["Adj Close"].rolling(window=180).mean()
-        df["Distance from MA_180"] = (df["Adj Close"] - df["MA_180"]) / df["MA_180"]
-
-        df["Monthly_Day_change_pc"] = (
-            df["Adj Close"] - df["Adj Close"].shift(30)
-        ) / df["Adj Close"].shift(30)
+        for window in ma_windows:
+            df[f"MA_{window}"] = indicators[f"SMA_{window}"]
+            df[f"Distance from MA_{window}"] = (
+                df["Adj Close"] - df[f"MA_{window}"]
+            ) / df[f"MA_{window}"]
 
         # Parameters
         uptick_constant = 0.01
@@ -145,10 +325,10 @@ def run_dashboard():
             [
                 (df["Monthly_Day_change_pc"] <= -downtick_constant),
                 (df["Monthly_Day_change_pc"] <= -downtick_constant),
-                (df["Distance from MA_5"] <= -downtick_constant),
-                (df["Distance from MA_30"] <= -downtick_constant),
-                (df["Distance from MA_90"] <= -downtick_constant),
-                (df["Distance from MA_180"] <= -downtick_constant),
+            ]
+            + [
+                (df[f"Distance from MA_{window}"] <= -downtick_constant)
+                for window in signal_ma_windows
             ]
         )
 
@@ -156,10 +336,10 @@ def run_dashboard():
             [
                 (df["Monthly_Day_change_pc"] >= uptick_constant),
                 (df["Monthly_Day_change_pc"] >= uptick_constant),
-                (df["Distance from MA_5"] >= uptick_constant),
-                (df["Distance from MA_30"] >= uptick_constant),
-                (df["Distance from MA_90"] >= uptick_constant),
-                (df["Distance from MA_180"] >= uptick_constant),
+            ]
+            + [
+                (df[f"Distance from MA_{window}"] >= uptick_constant)
+                for window in signal_ma_windows
             ]
         )
 
@@ -178,13 +358,16 @@ def run_dashboard():
 
         df.to_excel("output.xlsx", sheet_name="Sheet1")
 
+        # Lines are drawn at the bar closes, the signal markers keep every day
+        chart_df = df
+        if chart_resolution != "1d":
+            chart_df = df.loc[df.index.intersection(chart_bars.index)]
+
         fig, ax = plt.subplots()
 
-        ax.plot(df["Adj Close"], label="Price")
-        ax.plot(df["MA_5"], label="MA_5")
-        ax.plot(df["MA_30"], label="MA_30")
-        ax.plot(df["MA_90"], label="MA_90")
-        ax.plot(df["MA_180"], label="MA_180")
+        ax.plot(chart_df["Adj Close"], label="Price")
+        for window in signal_ma_windows:
+            ax.plot(chart_df[f"MA_{window}"], label=f"MA_{window}")
 
         ax.scatter(
             x=df_big_moves_buy.index,
@@ -204,8 +387,8 @@ def run_dashboard():
 
         # combined plotly.express view
         fig1 = px.line(
-            df,
-            y=["Adj Close", "MA_5", "MA_30", "MA_90", "MA_180"],
+            chart_df,
+            y=["Adj Close"] + [f"MA_{window}" for window in signal_ma_windows],
             color_discrete_sequence=["black", "orange", "green", "blue", "yellow"],
         )
         fig2 = px.scatter(
@@ -247,6 +430,22 @@ def run_dashboard():
         # plotly.express graph object: dynamic signals = fig_combined
         # st.plotly_chart(fig_combined)
 
+        with st.expander("Momentum Indicators"):
+            st.markdown("RSI (14)")
+            st.line_chart(indicators["RSI_14"])
+            st.markdown("MACD (12, 26, 9)")
+            st.line_chart(indicators[["MACD", "MACD_SIGNAL"]])
+            st.markdown("Bollinger Bands (20) and VWMA (20)")
+            st.line_chart(
+                pd.concat(
+                    [
+                        df["Adj Close"],
+                        indicators[["BB_UPPER_20", "BB_LOWER_20", "VWMA_20"]],
+                    ],
+                    axis=1,
+                )
+            )
+
         # Print Underlying Data for Recent Big moves.
         st.subheader("Signal data")
         st.dataframe(
@@ -262,6 +461,43 @@ def run_dashboard():
                 },
             )
 
+    if compare_tickers:
+        with compare_tab[0]:
+            comparison_tickers = [ticker.upper()] + [
+                compare_ticker
+                for compare_ticker in compare_tickers
+                if compare_ticker != ticker.upper()
+            ]
+            st.title(f"{', '.join(comparison_tickers)} Comparison")
+            st.markdown("Daily prices rebased to 100 at the start of the date range")
+
+            # All tickers share one wide matrix and one indicator pass
+            comparison = build_comparison(
+                get_comparison_prices(
+                    price_cube,
+                    price_segments,
+                    comparison_tickers,
+                    date_range,
+                    loaded_prices,
+                ),
+                MA_WINDOWS,
+                SIGNAL_MA_WINDOWS,
+                signal_tolerance,
+            )
+            ma_window = st.selectbox("Compare against MA", SIGNAL_MA_WINDOWS, index=2)
+            st.plotly_chart(
+                plot_comparison(comparison, date_range, ma_window),
+                use_container_width=True,
+            )
+
+            st.dataframe(
+                summarise_comparison(comparison, date_range, ma_window),
+                column_config={
+                    "Last buy": st.column_config.DateColumn(format="YYYY-MM-DD"),
+                    "Last sell": st.column_config.DateColumn(format="YYYY-MM-DD"),
+                },
+            )
+
 
 if __name__ == "__main__":
     run_dashboard()
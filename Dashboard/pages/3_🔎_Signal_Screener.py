@@ -0,0 +1,53 @@
+import streamlit as st
+
+from profiling import profiled
+from signal_screener import find_latest_results, load_snapshot, screen
+
+
+@st.cache_resource
+def get_snapshot(results_path):
+    return load_snapshot(results_path)
+
+
+@profiled
+def run_dashboard():
+    st.set_page_config(layout="wide", page_icon="🔎")
+
+    st.title("Signal Screener")
+
+    results_path = find_latest_results()
+    if results_path is None:
+        st.warning("No MA results found, run the MA analysis batch first.")
+        return
+
+    snapshot = get_snapshot(results_path)
+    st.markdown(f"Latest signal snapshot as of {snapshot['date'][0:10]}")
+
+    with st.sidebar:
+        st.subheader("Parameters:")
+        rank_by = st.selectbox(
+            "Rank by",
+            [name for name in snapshot["feature_names"] if name != "Price"],
+        )
+        direction = st.radio("Direction", ["Most oversold", "Most overbought"])
+        k = int(st.number_input("Top", min_value=1, value=20))
+        signal = st.selectbox("Signal", ["All", "BUY", "SELL"])
+        min_streak = int(
+            st.number_input("Minimum consecutive breach days", min_value=0, value=0)
+        )
+
+    screened = screen(
+        snapshot,
+        rank_by=rank_by,
+        k=k,
+        largest=direction == "Most overbought",
+        signal=None if signal == "All" else signal,
+        min_streak=min_streak or None,
+    )
+
+    st.subheader(f"Top {k} {direction.lower()} by {rank_by}")
+    st.dataframe(screened, use_container_width=True)
+
+
+if __name__ == "__main__":
+    run_dashboard()
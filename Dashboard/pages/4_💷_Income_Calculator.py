@@ -0,0 +1,100 @@
+import numpy as np
+import pandas as pd
+import plotly.express as px
+import streamlit as st
+
+from income_tax import STUDENT_LOAN_RATES, TAX_YEARS, calculate_take_home
+from profiling import profiled
+
+DEDUCTIONS = ["Income Tax", "National Insurance", "Student Loan", "Pension"]
+
+
+@profiled
+def run_dashboard():
+    st.set_page_config(layout="wide", page_icon="💷")
+
+    st.title("UK Income Calculator")
+    st.markdown(
+        "Take-home pay after income tax, employee NI, student loan and salary "
+        "sacrifice pension. Not tax advice, figures are an illustration only."
+    )
+
+    with st.sidebar:
+        st.subheader("Parameters:")
+        salary = st.number_input(
+            "Gross salary (£)", min_value=0, value=50000, step=1000
+        )
+        tax_year = st.selectbox("Tax year", list(TAX_YEARS), index=len(TAX_YEARS) - 1)
+        pension_pct = st.slider("Pension contribution (%)", 0.0, 40.0, 5.0, 0.5)
+        student_loan_plans = st.multiselect(
+            "Student loan plans",
+            list(STUDENT_LOAN_RATES),
+            help=(
+                "Several undergraduate plans share one 9% repayment above the lowest"
+                " threshold, a Postgraduate loan is repaid on top."
+            ),
+        )
+        max_salary = st.slider("Chart salary range (£)", 50000, 500000, 250000, 10000)
+
+    # Cheap enough to recompute the whole grid on every slider move
+    gross_incomes = np.arange(0, max_salary + 1, 100, dtype=float)
+    take_home = calculate_take_home(salary, tax_year, pension_pct, student_loan_plans)
+    take_home_grid = calculate_take_home(
+        gross_incomes, tax_year, pension_pct, student_loan_plans
+    )
+    net_by_tax_year = pd.DataFrame(
+        {
+            year: calculate_take_home(
+                gross_incomes, year, pension_pct, student_loan_plans
+            )["Net Income"]
+            for year in TAX_YEARS
+        },
+        index=pd.Index(gross_incomes, name="Gross Income"),
+    )
+    take_home_rates = net_by_tax_year.div(net_by_tax_year.index, axis=0).fillna(1.0)
+
+    breakdown = pd.DataFrame(
+        {"Yearly": {name: float(value) for name, value in take_home.items()}}
+    )
+    breakdown["Monthly"] = breakdown["Yearly"] / 12
+    breakdown["Weekly"] = breakdown["Yearly"] / 52
+
+    col1, col2 = st.columns([1, 2])
+
+    with col1:
+        st.subheader(f"{tax_year} Breakdown")
+        st.dataframe(breakdown.style.format("£{:,.2f}"), use_container_width=True)
+
+    with col2:
+        fig = px.line(
+            take_home_rates,
+            labels={"value": "Take-Home Rate", "variable": "Tax Year"},
+            title="Take Home % by Tax Year",
+        )
+        fig.add_vline(x=salary, line_dash="dash", line_color="grey")
+        fig.update_layout(
+            title_x=0.5,
+            yaxis_tickformat=",.0%",
+            legend_orientation="h",
+            margin=dict(l=0, r=0, t=25, b=0),
+        )
+        st.plotly_chart(fig, use_container_width=True)
+
+    deductions = pd.DataFrame(
+        {name: take_home_grid[name] for name in ["Net Income"] + DEDUCTIONS},
+        index=pd.Index(gross_incomes, name="Gross Income"),
+    )
+    fig = px.area(
+        deductions,
+        labels={"value": "Amount (£)", "variable": ""},
+        title=f"Where the Gross Income Goes ({tax_year})",
+    )
+    fig.add_vline(x=salary, line_dash="dash", line_color="grey")
+    fig.update_layout(
+        title_x=0.5, legend_orientation="h", margin=dict(l=0, r=0, t=25, b=0)
+    )
+    st.plotly_chart(fig, use_container_width=True)
+
+
+if __name__ == "__main__":
+    run_dashboard()
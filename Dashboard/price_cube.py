@@ -0,0 +1,172 @@
+### Shared Price Cube
+import datetime as dt
+import json
+import os
+import sys
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from data_quality import (
+    MISSING_PRICE_TOLERANCE,
+    clean_price_column,
+    clean_price_frame,
+)
+from indicators import compute_indicators, indicator_frame
+from yahoo_downloads import download_tickers
+
+PRICE_CUBE_DIR = Path(__file__).parent / "Data" / "Price Cube"
+PRICE_FIELDS = ["Open", "High", "Low", "Close", "Adj Close", "Volume"]
+CUBE_MA_WINDOWS = (5, 30, 60, 90, 180)
+# Names the current cube version, each version is a .npy and .json pair
+CUBE_POINTER_FILE = "price_cube.current"
+# Versions kept besides the current one, for readers still mapping them
+KEEP_OLD_VERSIONS = 1
+
+
+def download_prices(tickers, start_date):
+    # (field, ticker) columns, the layout write_price_cube expects
+    prices = pd.concat(download_tickers(tickers, start_date), axis=1)
+    return prices.swaplevel(axis=1).sort_index(axis=1).sort_index()
+
+
+def get_cube_version(cube_dir=PRICE_CUBE_DIR):
+    pointer_path = Path(cube_dir) / CUBE_POINTER_FILE
+    if not pointer_path.exists():
+        return None
+    return pointer_path.read_text().strip()
+
+
+def remove_old_versions(cube_dir, current_version):
+    versions = sorted(path.stem for path in Path(cube_dir).glob("price_cube_*.json"))
+    old_versions = [version for version in versions if version != current_version]
+    for version in old_versions[: max(len(old_versions) - KEEP_OLD_VERSIONS, 0)]:
+        for suffix in (".npy", ".json"):
+            (Path(cube_dir) / f"{version}{suffix}").unlink(missing_ok=True)
+
+
+def write_price_cube(prices, cube_dir=PRICE_CUBE_DIR, ma_windows=CUBE_MA_WINDOWS):
+    # prices has (field, ticker) columns as returned by a multi-ticker yf.download
+    prices = prices.sort_index()
+    tickers = prices["Adj Close"].columns.tolist()
+    # Moving averages are built from validated prices, bad ticks are skipped
+    adj_close, _ = clean_price_frame(prices["Adj Close"])
+    moving_averages = compute_indicators(
+        adj_close.to_numpy(dtype=float),
+        sma_windows=ma_windows,
+        missing_tolerance=MISSING_PRICE_TOLERANCE,
+    )
+    fields = PRICE_FIELDS + [f"SMA_{window}" for window in ma_windows]
+
+    cube_dir = Path(cube_dir)
+    cube_dir.mkdir(parents=True, exist_ok=True)
+    version = f"price_cube_{dt.datetime.now():%Y%m%d_%H%M%S_%f}"
+
+    # fields x dates x tickers, so each field is one contiguous dates x tickers block
+    cube = np.lib.format.open_memmap(
+        cube_dir / f"{version}.npy",
+        mode="w+",
+        dtype=np.float64,
+        shape=(len(fields), len(prices.index), len(tickers)),
+    )
+    for position, field in enumerate(PRICE_FIELDS):
+        cube[position] = prices[field][tickers].to_numpy(dtype=float)
+    for position, window in enumerate(ma_windows, start=len(PRICE_FIELDS)):
+        cube[position] = moving_averages[f"SMA_{window}"]
+    cube.flush()
+    del cube
+
+    meta = {
+        "tickers": tickers,
+        "dates": [str(date.date()) for date in prices.index],
+        "fields": fields,
+        "updated": dt.datetime.now().isoformat(timespec="seconds"),
+    }
+    with open(cube_dir / f"{version}.json", "w") as meta_file:
+        json.dump(meta, meta_file)
+
+    # Readers follow the pointer, so replacing that one file switches the cube and
+    # its metadata together and a reader never pairs a new cube with old metadata
+    with open(cube_dir / f"{CUBE_POINTER_FILE}.tmp", "w") as pointer_file:
+        pointer_file.write(version)
+    os.replace(cube_dir / f"{CUBE_POINTER_FILE}.tmp", cube_dir / CUBE_POINTER_FILE)
+    remove_old_versions(cube_dir, version)
+
+
+def load_price_cube(cube_dir=PRICE_CUBE_DIR):
+    cube_dir = Path(cube_dir)
+    version = get_cube_version(cube_dir)
+    if version is None:
+        return None
+
+    with open(cube_dir / f"{version}.json") as meta_file:
+        meta = json.load(meta_file)
+
+    # A read-only memory map: pages are shared through the OS page cache by every
+    # session and every process that maps the same file, nothing is copied
+    cube = np.load(cube_dir / f"{version}.npy", mmap_mode="r")
+
+    return {
+        "cube": cube,
+        "dates": pd.DatetimeIndex(meta["dates"], name="Date"),
+        "tickers": meta["tickers"],
+        "fields": meta["fields"],
+        "ticker_columns": {ticker: i for i, ticker in enumerate(meta["tickers"])},
+        "updated": meta["updated"],
+    }
+
+
+def get_field_view(price_cube, field):
+    # dates x tickers view of one field
+    return price_cube["cube"][price_cube["fields"].index(field)]
+
+
+def get_ticker_frame(price_cube, ticker, start_date=None):
+    first_row = 0
+    if start_date is not None:
+        first_row = price_cube["dates"].searchsorted(pd.Timestamp(start_date))
+
+    # Skip the rows before the ticker listed by slicing, which keeps it a view
+    column = price_cube["ticker_columns"][ticker]
+    adj_close = get_field_view(price_cube, "Adj Close")[first_row:, column]
+    first_row += int(np.argmax(~np.isnan(adj_close)))
+    ticker_view = price_cube["cube"][:, first_row:, column].T
+
+    return pd.DataFrame(
+        ticker_view,
+        index=price_cube["dates"][first_row:],
+        columns=price_cube["fields"],
+        copy=False,
+    )
+
+
+def get_cube_indicators(price_cube, ticker, ticker_prices, indicator_params):
+    # SMAs held in the cube are read from their field views, the other indicators
+    # are computed from the ticker's validated prices
+    sma_windows = indicator_params.get("sma_windows", ())
+    cube_windows = [
+        window for window in sma_windows if f"SMA_{window}" in price_cube["fields"]
+    ]
+    indicators = indicator_frame(
+        clean_price_column(ticker_prices),
+        **dict(
+            indicator_params,
+            sma_windows=tuple(
+                window for window in sma_windows if window not in cube_windows
+            ),
+        ),
+    )
+
+    rows = price_cube["dates"].get_indexer(ticker_prices.index)
+    column = price_cube["ticker_columns"][ticker]
+    for window in cube_windows:
+        indicators[f"SMA_{window}"] = get_field_view(price_cube, f"SMA_{window}")[
+            rows, column
+        ]
+    return indicators
+
+
+if __name__ == "__main__":
+    # python price_cube.py AAPL MSFT AMZN ...
+    write_price_cube(download_prices(sys.argv[1:], dt.date(2015, 1, 1)))
@@ -0,0 +1,207 @@
+### Range-Aware Price Segments
+import collections
+import datetime as dt
+import threading
+
+import pandas as pd
+
+from data_quality import clean_price_column
+from indicators import indicator_frame
+from yahoo_downloads import download_ticker
+
+# Rows of history needed before the range so the longest MA (180) is complete
+WARMUP_ROWS = 180
+# Calendar days added on top of the business days to cover market holidays
+HOLIDAY_PADDING_DAYS = 14
+
+# Daily bars are settled a little after the 16:00 New York close
+MARKET_TIMEZONE = "America/New_York"
+MARKET_CLOSE_OFFSET = pd.Timedelta(hours=16, minutes=30)
+
+
+def get_warmup_start(start_date, warmup_rows=WARMUP_ROWS):
+    warmup_start = pd.Timestamp(start_date) - pd.offsets.BDay(warmup_rows)
+    return (warmup_start - pd.Timedelta(days=HOLIDAY_PADDING_DAYS)).date()
+
+
+def get_last_close(now=None):
+    now = now if now is not None else pd.Timestamp.now(tz=MARKET_TIMEZONE)
+    close_day = pd.offsets.BDay().rollback((now - MARKET_CLOSE_OFFSET).normalize())
+    return close_day + MARKET_CLOSE_OFFSET
+
+
+def get_next_close(now=None):
+    last_close = get_last_close(now)
+    return last_close.normalize() + pd.offsets.BDay(1) + MARKET_CLOSE_OFFSET
+
+
+def get_indicators(prices, indicator_params):
+    # Indicators skip the prices that failed validation
+    return indicator_frame(clean_price_column(prices), **indicator_params)
+
+
+def merge_prices(parts):
+    prices = pd.concat(parts).sort_index()
+    return prices.loc[~prices.index.duplicated(keep="last")]
+
+
+def new_segment_store():
+    # One merged segment per ticker, shared by every session of the server process.
+    # Requests are counted so the most viewed tickers can be kept warm
+    return {
+        "lock": threading.Lock(),
+        "segments": {},
+        "requests": collections.Counter(),
+        "refreshing": set(),
+    }
+
+
+def new_segment(prices, start, end_date, indicator_params):
+    return {
+        "start": start,
+        "end": end_date,
+        "prices": prices,
+        "indicators": get_indicators(prices, indicator_params),
+        "indicator_params": indicator_params,
+        "fetched_at": pd.Timestamp.now(tz=MARKET_TIMEZONE),
+    }
+
+
+def covers_range(segment, warmup_start, indicator_params):
+    return (
+        segment is not None
+        and segment["indicator_params"] == indicator_params
+        and warmup_start >= segment["start"]
+    )
+
+
+def load_segment(ticker, warmup_start, end_date, indicator_params, segment=None):
+    # Downloads whatever the held segment is missing on either side of the range
+    if segment is None or segment["indicator_params"] != indicator_params:
+        prices = download_ticker(ticker, warmup_start, end_date)
+    else:
+        parts = [segment["prices"]]
+        if warmup_start < segment["start"]:
+            parts.insert(
+                0,
+                download_ticker(
+                    ticker, warmup_start, segment["start"] - dt.timedelta(days=1)
+                ),
+            )
+        if end_date > segment["end"]:
+            parts.append(
+                download_ticker(
+                    ticker, segment["end"] + dt.timedelta(days=1), end_date
+                )
+            )
+        prices = merge_prices(parts)
+        warmup_start = min(warmup_start, segment["start"])
+        end_date = max(end_date, segment["end"])
+
+    return new_segment(prices, warmup_start, end_date, indicator_params)
+
+
+def is_stale(segment):
+    return segment["fetched_at"] < get_last_close()
+
+
+def merge_segments(segment, other):
+    # Rows of both segments, the more recently fetched one wins where they overlap
+    older, newer = sorted([segment, other], key=lambda held: held["fetched_at"])
+    prices = merge_prices([older["prices"], newer["prices"]])
+    return {
+        **newer,
+        "start": min(older["start"], newer["start"]),
+        "end": max(older["end"], newer["end"]),
+        "prices": prices,
+        "indicators": get_indicators(prices, newer["indicator_params"]),
+    }
+
+
+def store_segment(store, ticker, segment, replaces):
+    # Swapped in only if nobody stored another segment for the ticker meanwhile,
+    # otherwise the two are merged so a widened range and a refresh keep both
+    while True:
+        with store["lock"]:
+            current = store["segments"].get(ticker)
+            if (
+                current is replaces
+                or current is None
+                or current["indicator_params"] != segment["indicator_params"]
+            ):
+                store["segments"][ticker] = segment
+                return segment
+        segment = merge_segments(current, segment)
+        replaces = current
+
+
+def refresh_segment(store, ticker, end_date):
+    # The last held bar is downloaded again in case it was still forming. The held
+    # segment keeps being served until the refreshed one is swapped in
+    with store["lock"]:
+        segment = store["segments"][ticker]
+    held = segment["prices"]
+    refresh_start = held.index[-1].date() if len(held) else segment["start"]
+    refresh_end = max(end_date, segment["end"])
+
+    prices = merge_prices([held, download_ticker(ticker, refresh_start, refresh_end)])
+    refreshed = {
+        **segment,
+        "end": refresh_end,
+        "prices": prices,
+        "indicators": get_indicators(prices, segment["indicator_params"]),
+        "fetched_at": pd.Timestamp.now(tz=MARKET_TIMEZONE),
+    }
+    return store_segment(store, ticker, refreshed, replaces=segment)
+
+
+def start_refresh(store, ticker, end_date):
+    # At most one background refresh per ticker, a failed one leaves the last-good
+    # segment in place and is retried on the next read
+    with store["lock"]:
+        if ticker in store["refreshing"]:
+            return
+        store["refreshing"].add(ticker)
+
+    def refresh():
+        try:
+            refresh_segment(store, ticker, end_date)
+        except Exception as error:
+            print(f"Refreshing {ticker} failed: {error}")
+        finally:
+            with store["lock"]:
+                store["refreshing"].discard(ticker)
+
+    threading.Thread(target=refresh, daemon=True).start()
+
+
+def is_refreshing(store, ticker):
+    with store["lock"]:
+        return ticker in store["refreshing"]
+
+
+def read_price_range(store, ticker, start_date, end_date, indicator_params):
+    # Prices and indicators from the warm-up start to end_date. A held segment is
+    # served straight away (stale-while-revalidate): newer bars are downloaded in
+    # the background and show up on a later rerun
+    warmup_start = get_warmup_start(start_date)
+    with store["lock"]:
+        store["requests"][ticker] += 1
+        segment = store["segments"].get(ticker)
+
+    if covers_range(segment, warmup_start, indicator_params):
+        if end_date > segment["end"] or is_stale(segment):
+            start_refresh(store, ticker, end_date)
+    else:
+        segment = store_segment(
+            store,
+            ticker,
+            load_segment(ticker, warmup_start, end_date, indicator_params, segment),
+            replaces=segment,
+        )
+
+    in_range = slice(pd.Timestamp(warmup_start), pd.Timestamp(end_date))
+    return (
+        segment["prices"].loc[in_range].copy(),
+        segment["indicators"].loc[in_range],
+    )
@@ -0,0 +1,297 @@
+### Daily Price Store
+import hashlib
+import json
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from price_cube import PRICE_CUBE_DIR, get_cube_version, write_price_cube
+from price_ranges import get_last_close
+from yahoo_downloads import download_tickers
+
+PRICE_STORE_DIR = Path(__file__).parent / "Data" / "Price Store"
+
+# Rows re-downloaded on every update to check the stored history is still current
+CHECKSUM_OVERLAP_ROWS = 20
+
+# Weekly and monthly bars are kept next to the daily prices, one folder each
+BAR_RESOLUTIONS = {"1wk": "W-FRI", "1mo": "M"}
+BAR_AGGREGATIONS = {
+    "Open": "first",
+    "High": "max",
+    "Low": "min",
+    "Close": "last",
+    "Adj Close": "last",
+    "Volume": "sum",
+}
+# Approximate trading days per bar, used to size a view in bars
+RESOLUTION_DAYS = {"1d": 1, "1wk": 5, "1mo": 21}
+MAX_VIEW_BARS = 600
+
+
+def get_checksum(adj_close):
+    # Rounded so float noise in Yahoo's responses does not look like a revision
+    values = np.round(np.asarray(adj_close, dtype=float), 4)
+    return hashlib.md5(values.tobytes()).hexdigest()
+
+
+def get_block_checksums(prices):
+    # One checksum per calendar year of Adj Close history
+    return {
+        str(year): get_checksum(year_prices["Adj Close"])
+        for year, year_prices in prices.groupby(prices.index.year)
+    }
+
+
+def load_manifest(store_dir=PRICE_STORE_DIR):
+    manifest_path = Path(store_dir) / "manifest.json"
+    if not manifest_path.exists():
+        return {}
+    with open(manifest_path) as manifest_file:
+        return json.load(manifest_file)
+
+
+def save_manifest(manifest, store_dir=PRICE_STORE_DIR):
+    with open(Path(store_dir) / "manifest.json", "w") as manifest_file:
+        json.dump(manifest, manifest_file, indent=1)
+
+
+def get_prices_path(ticker, store_dir=PRICE_STORE_DIR, resolution="1d"):
+    if resolution == "1d":
+        return Path(store_dir) / f"{ticker}.parquet"
+    return Path(store_dir) / resolution / f"{ticker}.parquet"
+
+
+def read_stored_prices(ticker, store_dir=PRICE_STORE_DIR, resolution="1d"):
+    return pd.read_parquet(get_prices_path(ticker, store_dir, resolution))
+
+
+def aggregate_bars(prices, resolution):
+    # Each bar is labelled with the last trading date of its week or month
+    periods = prices.index.to_period(BAR_RESOLUTIONS[resolution])
+    bars = prices.groupby(periods).agg(
+        {
+            field: how
+            for field, how in BAR_AGGREGATIONS.items()
+            if field in prices.columns
+        }
+    )
+    last_dates = pd.Series(prices.index, index=prices.index).groupby(periods).last()
+    bars.index = pd.DatetimeIndex(last_dates.to_numpy(), name=prices.index.name)
+    return bars
+
+
+def get_view_bars(ticker, prices, resolution, store_dir=PRICE_STORE_DIR):
+    # Weekly or monthly bars of `prices` for a chart. Stored tickers read the
+    # pre-aggregated bars, only the first and last periods, which may be partial,
+    # are aggregated from the daily rows
+    bars_path = get_prices_path(ticker, store_dir, resolution)
+    if not bars_path.exists():
+        return aggregate_bars(prices, resolution)
+
+    stored_bars = pd.read_parquet(bars_path, columns=list(prices.columns))
+    if stored_bars.empty:
+        return aggregate_bars(prices, resolution)
+    frequency = BAR_RESOLUTIONS[resolution]
+    first_full_start = (prices.index[0].to_period(frequency) + 1).start_time
+    # The last period of either the stored bars or the range may be partial
+    last_day = min(stored_bars.index[-1], prices.index[-1])
+    last_start = last_day.to_period(frequency).start_time
+    if first_full_start >= last_start:
+        return aggregate_bars(prices, resolution)
+
+    return pd.concat(
+        [
+            aggregate_bars(prices.loc[prices.index < first_full_start], resolution),
+            stored_bars.loc[
+                (stored_bars.index >= first_full_start)
+                & (stored_bars.index < last_start)
+            ],
+            aggregate_bars(prices.loc[prices.index >= last_start], resolution),
+        ]
+    )
+
+
+def write_stored_bars(ticker, prices, changed_from=None, store_dir=PRICE_STORE_DIR):
+    for resolution, frequency in BAR_RESOLUTIONS.items():
+        bars_path = get_prices_path(ticker, store_dir, resolution)
+        bars_path.parent.mkdir(exist_ok=True)
+
+        if changed_from is None or not bars_path.exists():
+            bars = aggregate_bars(prices, resolution)
+        else:
+            # Only the week or month holding the first new row onwards is rebuilt
+            period_start = pd.Timestamp(changed_from).to_period(frequency).start_time
+            stored_bars = pd.read_parquet(bars_path)
+            bars = pd.concat(
+                [
+                    stored_bars.loc[stored_bars.index < period_start],
+                    aggregate_bars(
+                        prices.loc[prices.index >= period_start], resolution
+                    ),
+                ]
+            )
+        bars.to_parquet(bars_path)
+
+
+def write_stored_prices(
+    ticker, prices, manifest, store_dir=PRICE_STORE_DIR, changed_from=None
+):
+    prices.to_parquet(get_prices_path(ticker, store_dir))
+    write_stored_bars(ticker, prices, changed_from, store_dir)
+    tail = prices.tail(CHECKSUM_OVERLAP_ROWS)
+    manifest[ticker] = {
+        "first_date": str(prices.index[0].date()),
+        "last_date": str(prices.index[-1].date()),
+        "blocks": get_block_checksums(prices),
+        "tail": {
+            "start": str(tail.index[0].date()),
+            "end": str(tail.index[-1].date()),
+            "checksum": get_checksum(tail["Adj Close"]),
+        },
+    }
+
+
+def get_settled_prices(prices):
+    # A bar is stored once its close has settled. Storing a bar that is still
+    # forming would make the next run see its change as a revision
+    last_settled = pd.Timestamp(get_last_close().date())
+    return prices.loc[prices.index <= last_settled]
+
+
+def find_first_revised_date(old_blocks, new_blocks):
+    for year in sorted(new_blocks):
+        if old_blocks.get(year) != new_blocks[year]:
+            return f"{year}-01-01"
+    return None
+
+
+def update_price_store(
+    tickers, start_date, store_dir=PRICE_STORE_DIR, cube_dir=PRICE_CUBE_DIR
+):
+    Path(store_dir).mkdir(parents=True, exist_ok=True)
+    manifest = load_manifest(store_dir)
+    changes = {"new": [], "appended": {}, "revised": {}, "missing": []}
+
+    stored_tickers = [ticker for ticker in tickers if ticker in manifest]
+    new_tickers = [ticker for ticker in tickers if ticker not in manifest]
+
+    # One batched download covering every stored ticker's overlap window
+    if stored_tickers:
+        overlap_start = min(
+            manifest[ticker]["tail"]["start"] for ticker in stored_tickers
+        )
+        fetched = download_tickers(stored_tickers, overlap_start)
+
+        for ticker in stored_tickers:
+            recent = fetched.get(ticker)
+            if recent is not None:
+                recent = get_settled_prices(recent)
+            # Delisted or failed downloads keep their stored history untouched
+            if recent is None or recent.empty:
+                changes["missing"].append(ticker)
+                continue
+
+            tail = manifest[ticker]["tail"]
+            overlap = recent.loc[tail["start"] : tail["end"]]
+
+            # A changed overlap means Yahoo re-adjusted the history (split/dividend)
+            if get_checksum(overlap["Adj Close"]) != tail["checksum"]:
+                changes["revised"][ticker] = None
+                continue
+
+            new_rows = recent.loc[recent.index > pd.Timestamp(tail["end"])]
+            if len(new_rows):
+                prices = pd.concat([read_stored_prices(ticker, store_dir), new_rows])
+                write_stored_prices(
+                    ticker, prices, manifest, store_dir, changed_from=new_rows.index[0]
+                )
+                changes["appended"][ticker] = len(new_rows)
+            elif not all(
+                get_prices_path(ticker, store_dir, resolution).exists()
+                for resolution in BAR_RESOLUTIONS
+            ):
+                # Tickers stored before the weekly and monthly bars existed
+                write_stored_bars(
+                    ticker, read_stored_prices(ticker, store_dir), store_dir=store_dir
+                )
+
+    # Only revised and new tickers pay for a full history download
+    full_tickers = list(changes["revised"]) + new_tickers
+    if full_tickers:
+        fetched = download_tickers(full_tickers, start_date)
+
+        for ticker in full_tickers:
+            prices = fetched.get(ticker)
+            if prices is not None:
+                prices = get_settled_prices(prices)
+            if prices is None or prices.empty:
+                changes["revised"].pop(ticker, None)
+                changes["missing"].append(ticker)
+                continue
+
+            if ticker in changes["revised"]:
+                changes["revised"][ticker] = find_first_revised_date(
+                    manifest[ticker]["blocks"], get_block_checksums(prices)
+                )
+            else:
+                changes["new"].append(ticker)
+            write_stored_prices(ticker, prices, manifest, store_dir)
+
+    save_manifest(manifest, store_dir)
+
+    # The dashboards' shared cube is rebuilt from every stored ticker when the
+    # stored prices changed, sessions pick it up when their cube handle expires
+    has_changed = changes["new"] or changes["appended"] or changes["revised"]
+    if cube_dir is not None and manifest and (
+        has_changed or get_cube_version(cube_dir) is None
+    ):
+        write_price_cube(read_price_fields(list(manifest), store_dir), cube_dir)
+    return changes
+
+
+def read_price_matrix(
+    tickers,
+    field="Adj Close",
+    last_rows=None,
+    store_dir=PRICE_STORE_DIR,
+    resolution="1d",
+):
+    # Wide dates x tickers frame of one field, optionally only the latest rows.
+    # Weekly and monthly matrices read the pre-aggregated bars
+    columns = {}
+    for ticker in tickers:
+        # Tickers that were never stored (failed or delisted) are left out
+        if not get_prices_path(ticker, store_dir, resolution).exists():
+            continue
+        prices = read_stored_prices(ticker, store_dir, resolution)[field]
+        columns[ticker] = prices if last_rows is None else prices.tail(last_rows)
+    if not columns:
+        return pd.DataFrame(index=pd.DatetimeIndex([], name="Date"))
+
+    data = pd.concat(columns, axis=1).sort_index()
+    data.index.name = "Date"
+    return data
+
+
+def read_price_fields(tickers, store_dir=PRICE_STORE_DIR):
+    # Every field of every stored ticker as (field, ticker) columns, each parquet
+    # file is read once
+    prices = pd.concat(
+        {ticker: read_stored_prices(ticker, store_dir) for ticker in tickers}, axis=1
+    )
+    prices.index.name = "Date"
+    return prices.swaplevel(axis=1).sort_index(axis=1).sort_index()
+
+
+def get_view_resolution(start_date, end_date, max_bars=MAX_VIEW_BARS):
+    # Finest resolution that still fits the view in max_bars bars
+    trading_days = np.busday_count(
+        np.datetime64(pd.Timestamp(start_date).date()),
+        np.datetime64(pd.Timestamp(end_date).date()),
+    )
+    for resolution, days in RESOLUTION_DAYS.items():
+        if trading_days / days <= max_bars:
+            return resolution
+    return "1mo"
@@ -0,0 +1,91 @@
+### Opt-in Profiling
+import cProfile
+import datetime as dt
+import functools
+import os
+import sys
+from pathlib import Path
+
+PROFILE_DIR = Path(__file__).parent / "Data" / "Profiles"
+
+# DASHBOARD_PROFILE=1 (cProfile) or DASHBOARD_PROFILE=pyinstrument for any run,
+# or ?profile=1 / ?profile=pyinstrument on a page URL for a single session
+PROFILE_ENV_VAR = "DASHBOARD_PROFILE"
+PROFILE_QUERY_PARAM = "profile"
+
+
+def parse_profile_mode(value):
+    # Anything other than 1, true or pyinstrument (e.g. 0) leaves profiling off
+    value = (value or "").strip().lower()
+    if value in ("1", "true"):
+        return "cprofile"
+    if value == "pyinstrument":
+        return value
+    return None
+
+
+def get_query_param(streamlit, name):
+    # st.query_params arrived in Streamlit 1.30, the pinned 1.28 only has the
+    # experimental getter, which returns a list of values per parameter
+    if hasattr(streamlit, "query_params"):
+        return streamlit.query_params.get(name)
+    values = streamlit.experimental_get_query_params().get(name)
+    return values[0] if values else None
+
+
+def get_profile_mode():
+    mode = parse_profile_mode(os.environ.get(PROFILE_ENV_VAR))
+    if mode:
+        return mode
+
+    # Only look at the query string when already running inside a Streamlit app
+    streamlit = sys.modules.get("streamlit")
+    if streamlit is not None and streamlit.runtime.exists():
+        return parse_profile_mode(get_query_param(streamlit, PROFILE_QUERY_PARAM))
+    return None
+
+
+def run_with_cprofile(func, args, kwargs, profile_path):
+    profiler = cProfile.Profile()
+    try:
+        return profiler.runcall(func, *args, **kwargs)
+    finally:
+        # Open with `python -m pstats` or snakeviz for a flame graph
+        profiler.dump_stats(profile_path.with_suffix(".prof"))
+
+
+def run_with_pyinstrument(Profiler, func, args, kwargs, profile_path):
+    profiler = Profiler()
+    profiler.start()
+    try:
+        return func(*args, **kwargs)
+    finally:
+        profiler.stop()
+        profile_path.with_suffix(".html").write_text(profiler.output_html())
+
+
+def profiled(func):
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        mode = get_profile_mode()
+        if not mode:
+            return func(*args, **kwargs)
+
+        PROFILE_DIR.mkdir(parents=True, exist_ok=True)
+        timestamp = dt.datetime.now().strftime("%Y%m%d_%H%M%S_%f")
+        # Pages run as __main__, so profiles are named after the source file
+        source_name = Path(func.__code__.co_filename).stem
+        profile_path = PROFILE_DIR / f"{source_name}_{func.__name__}_{timestamp}"
+
+        if mode == "pyinstrument":
+            try:
+                from pyinstrument import Profiler
+            except ImportError:
+                print("pyinstrument is not installed, falling back to cProfile")
+            else:
+                return run_with_pyinstrument(
+                    Profiler, func, args, kwargs, profile_path
+                )
+        return run_with_cprofile(func, args, kwargs, profile_path)
+
+    return wrapper
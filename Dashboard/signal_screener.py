@@ -0,0 +1,125 @@
+### Signal Screener
+import datetime as dt
+import os
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+MA_RESULTS_DIR = Path(__file__).parent / "ma_results"
+
+
+def find_latest_results(results_dir=MA_RESULTS_DIR):
+    results_paths = {}
+    for file_path in Path(results_dir).glob("ma_results_*.csv"):
+        results_date = dt.datetime.strptime(file_path.stem[-10:], "%Y-%m-%d").date()
+        results_paths[results_date] = file_path
+
+    if not results_paths:
+        return None
+    return results_paths[max(results_paths)]
+
+
+def build_screener_snapshot(results):
+    # Wide dates x tickers views of the history, only needed to derive streaks
+    signals = results.pivot(index="Date", columns="Ticker", values="Signal")
+    signals = signals.sort_index()
+    tickers = signals.columns.tolist()
+
+    signal_state = np.select(
+        [signals.values == "SELL", signals.values == "BUY"], [1, -1], default=0
+    )
+
+    # Streak = number of trailing days sharing the latest day's signal direction
+    latest_state = signal_state[-1]
+    same_as_latest = (signal_state[::-1] == latest_state) & (latest_state != 0)
+    streak = np.cumprod(same_as_latest, axis=0).sum(axis=0) * latest_state
+
+    latest = (
+        results.loc[results["Date"] == signals.index[-1]]
+        .set_index("Ticker")
+        .reindex(tickers)
+    )
+    feature_names = ["Price", "Total_Breach"] + [
+        column for column in latest.columns if column.startswith("Delta_MA")
+    ]
+    features = np.column_stack(
+        [latest[feature_names].to_numpy(dtype=float), streak.astype(float)]
+    )
+
+    return {
+        "date": str(signals.index[-1]),
+        "tickers": np.asarray(tickers, dtype=str),
+        "signals": np.asarray(latest["Signal"].fillna(""), dtype=str),
+        "feature_names": feature_names + ["Streak"],
+        "features": features,
+    }
+
+
+def save_snapshot(snapshot, snapshot_path):
+    np.savez(
+        snapshot_path,
+        date=np.asarray(snapshot["date"]),
+        tickers=snapshot["tickers"],
+        signals=snapshot["signals"],
+        feature_names=np.asarray(snapshot["feature_names"]),
+        features=snapshot["features"],
+    )
+
+
+def load_snapshot(results_path):
+    # Materialise the snapshot once next to the results file it was built from
+    results_path = Path(results_path)
+    snapshot_path = results_path.with_name(
+        results_path.name.replace("ma_results_", "ma_snapshot_")
+    ).with_suffix(".npz")
+
+    if snapshot_path.exists() and os.path.getmtime(snapshot_path) >= os.path.getmtime(
+        results_path
+    ):
+        with np.load(snapshot_path) as data:
+            return {
+                "date": str(data["date"]),
+                "tickers": data["tickers"],
+                "signals": data["signals"],
+                "feature_names": data["feature_names"].tolist(),
+                "features": data["features"],
+            }
+
+    snapshot = build_screener_snapshot(pd.read_csv(results_path))
+    save_snapshot(snapshot, snapshot_path)
+    return snapshot
+
+
+def screen(
+    snapshot,
+    rank_by="Total_Breach",
+    k=20,
+    largest=False,
+    signal=None,
+    min_streak=None,
+):
+    features = snapshot["features"]
+    values = features[:, snapshot["feature_names"].index(rank_by)]
+    streak = np.abs(features[:, snapshot["feature_names"].index("Streak")])
+
+    mask = ~np.isnan(values)
+    if signal is not None:
+        mask &= snapshot["signals"] == signal
+    if min_streak is not None:
+        mask &= streak >= min_streak
+
+    candidates = np.flatnonzero(mask)
+    scores = values[candidates] if largest else -values[candidates]
+
+    # Top-k selection first, then only the k winners get sorted
+    if len(candidates) > k:
+        top = np.argpartition(-scores, k - 1)[:k]
+        candidates, scores = candidates[top], scores[top]
+    rows = candidates[np.argsort(-scores, kind="stable")]
+
+    return pd.DataFrame(
+        features[rows],
+        index=pd.Index(snapshot["tickers"][rows], name="Ticker"),
+        columns=snapshot["feature_names"],
+    ).assign(Signal=snapshot["signals"][rows])
@@ -5,7 +5,13 @@ import matplotlib.pyplot as plt
 import numpy as np
 import pandas as pd
 import streamlit as st
-import yfinance as yf
+
+from data_quality import MISSING_PRICE_TOLERANCE, clean_price_column
+from indicators import indicator_frame
+from profiling import profiled
+from yahoo_downloads import download_yahoo
+
+MA_WINDOWS = (5, 30, 60, 90, 180)
 
 
 def test():
@@ -13,11 +19,12 @@ def test():
 
 
 def read_data(ticker):
-    return yf.download(
+    return download_yahoo(
         ticker, start="2010-01-01", end=dt.datetime.now().date() + dt.timedelta(days=1)
     )
 
 
+@profiled
 def run_dashboard():
     # Parameters required
     
@@ -35,20 +42,17 @@ def run_dashboard():
     last_price = round(df.tail(1)["Adj Close"].values[0], 2)
     last_date = str(df.tail(1).index.values[0])[0:10]
 
-    df["MA_5"] = df["Adj Close"].rolling(window=5).mean()
-    df["Distance from MA_5"] = (df["Adj Close"] - df["MA_5"]) / df["MA_5"]
-
-    df["MA_30"] = df["Adj Close"].rolling(window=30).mean()
-    df["Distance from MA_30"] = (df["Adj Close"] - df["MA_30"]) / df["MA_30"]
-
-    df["MA_60"] = df["Adj Close"].rolling(window=60).mean()
-    df["Distance from MA_60"] = (df["Adj Close"] - df["MA_60"]) / df["MA_60"]
-
-    df["MA_90"] = df["Adj Close"].rolling(window=90).mean()
-    df["Distance from MA_90"] = (df["Adj Close"] - df["MA_90"]) / df["MA_90"]
-
-    df["MA_180"] = df["Adj Close"].rolling(window=180).mean()
-    df["Distance from MA_180"] = (df["Adj Close"] - df["MA_180"]) / df["MA_180"]
+    # All MAs come out of one fused kernel pass
+    indicators = indicator_frame(
+        clean_price_column(df),
+        sma_windows=MA_WINDOWS,
+        missing_tolerance=MISSING_PRICE_TOLERANCE,
+    )
+    for window in MA_WINDOWS:
+        df[f"MA_{window}"] = indicators[f"SMA_{window}"]
+        df[f"Distance from MA_{window}"] = (df["Adj Close"] - df[f"MA_{window}"]) / df[
+            f"MA_{window}"
+        ]
 
     df["Monthly_Day_change_pc"] = (df["Adj Close"] - df["Adj Close"].shift(30)) / df[
         "Adj Close"
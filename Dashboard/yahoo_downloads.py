@@ -0,0 +1,51 @@
+### Yahoo Finance Downloads
+import datetime as dt
+import threading
+
+import pandas as pd
+import yfinance as yf
+
+# yf.download resets module-level state (shared._DFS, shared._ERRORS) at the start
+# of every call, so two downloads running at once in one process can lose or swap
+# each other's frames. Every download in the process goes through this lock
+download_lock = threading.Lock()
+
+
+def download_yahoo(tickers, **download_params):
+    with download_lock:
+        return yf.download(tickers, **download_params)
+
+
+def get_download_end(end_date=None):
+    # yfinance's end is exclusive, the default includes today
+    end_date = end_date if end_date is not None else dt.datetime.now().date()
+    return end_date + dt.timedelta(days=1)
+
+
+def download_ticker(ticker, start_date, end_date=None):
+    # One ticker's prices with flat Open ... Volume columns. Newer yfinance versions
+    # return (field, ticker) columns even for a single ticker
+    prices = download_yahoo(
+        ticker, start=start_date, end=get_download_end(end_date)
+    )
+    if isinstance(prices.columns, pd.MultiIndex):
+        prices = prices.droplevel(1, axis=1)
+    return prices
+
+
+def download_tickers(tickers, start_date, end_date=None):
+    # {ticker: prices} from one batched request, each frame laid out like
+    # download_ticker and without the rows that have no Adj Close
+    prices = download_yahoo(
+        tickers,
+        start=start_date,
+        end=get_download_end(end_date),
+        group_by="ticker",
+    )
+    if not isinstance(prices.columns, pd.MultiIndex):
+        prices = pd.concat({tickers[0]: prices}, axis=1)
+    return {
+        ticker: prices[ticker].dropna(subset=["Adj Close"])
+        for ticker in tickers
+        if ticker in prices.columns.get_level_values(0)
+    }
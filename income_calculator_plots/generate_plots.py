@@ -0,0 +1,88 @@
+### Income Calculator Plots
+import sys
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import plotly.express as px
+
+sys.path.append(str(Path(__file__).resolve().parents[1] / "Dashboard"))
+
+from income_tax import calculate_take_home
+
+PLOTS_DIR = Path(__file__).parent
+SERIES_PATH = PLOTS_DIR / "income_series.csv"
+PLOT_TAX_YEAR = "2021/22"
+PLOT_GROSS_INCOMES = np.arange(0, 250001, 500)
+
+
+def build_income_series(tax_year=PLOT_TAX_YEAR, gross_incomes=PLOT_GROSS_INCOMES):
+    take_home = calculate_take_home(gross_incomes, tax_year)
+    return pd.DataFrame(
+        {
+            "Gross Income": gross_incomes,
+            "Net Income": np.round(take_home["Net Income"], 2),
+        }
+    )
+
+
+def load_income_series(series_path=SERIES_PATH):
+    income = pd.read_csv(series_path)
+    gross = income["Gross Income"].to_numpy(dtype=float)
+    net = income["Net Income"].to_numpy(dtype=float)
+
+    # Rates are derived from gross and net, a zero income is taxed at 0%
+    with np.errstate(divide="ignore", invalid="ignore"):
+        income["Take-Home Rate"] = np.where(gross > 0, net / gross, 1.0)
+    income["Taxed Rate"] = np.where(gross > 0, 1 - income["Take-Home Rate"], 0.0)
+    return income
+
+
+def build_figures(income):
+    effective_rate_chart = px.line(
+        income,
+        x="Gross Income",
+        y="Taxed Rate",
+        title="Effective Taxed Rate % (inc NI)",
+    )
+    effective_rate_chart.update_layout(
+        yaxis_tickformat=",.0%", legend_orientation="h", hovermode="closest"
+    )
+
+    gross_to_net_plot = px.line(
+        income, x="Gross Income", y="Net Income", title="Net to Gross Income (UK)"
+    )
+    gross_to_net_plot.add_scatter(
+        x=income["Gross Income"],
+        y=income["Gross Income"],
+        mode="lines",
+        name="Gross Income = Net Income",
+    )
+    gross_to_net_plot.update_layout(showlegend=False, paper_bgcolor="rgba(0,0,0,0)")
+
+    take_home_percentage = px.line(
+        income, x="Gross Income", y="Take-Home Rate", title="Take Home %"
+    )
+    take_home_percentage.update_layout(
+        yaxis_tickformat=",.0%", legend_orientation="h", hovermode="closest"
+    )
+
+    figures = {
+        "effective_rate_chart": effective_rate_chart,
+        "gross_to_net_plot": gross_to_net_plot,
+        "take_home_percentage": take_home_percentage,
+    }
+    for fig in figures.values():
+        fig.update_layout(title_x=0.5, margin=dict(l=0, r=0, t=25, b=0))
+    return figures
+
+
+def write_plots(figures, plots_dir=PLOTS_DIR):
+    # plotly.js is loaded from the CDN rather than inlined into every page
+    for name, fig in figures.items():
+        fig.write_html(Path(plots_dir) / f"{name}.html", include_plotlyjs="cdn")
+
+
+if __name__ == "__main__":
+    build_income_series().to_csv(SERIES_PATH, index=False)
+    write_plots(build_figures(load_income_series()))
@@ -1,19 +1,45 @@
 ### Moving Average Dashboard
 import datetime as dt
+import sys
+from pathlib import Path
 
 import matplotlib.pyplot as plt
 import numpy as np
 import pandas as pd
 import streamlit as st
-import yfinance as yf
-
-
-def read_yahoo_historical_data(ticker):
-    return yf.download(
-        ticker, start="2010-01-01", end=dt.datetime.now().date() + dt.timedelta(days=1)
-    )
-
 
+# Shared dashboard modules live in Dashboard/
+sys.path.append(str(Path(__file__).resolve().parents[1] / "Dashboard"))
+from cache_warming import start_cache_warmer
+from comparison import (
+    COMPARE_TICKERS,
+    build_comparison,
+    plot_comparison,
+    read_comparison_prices,
+    summarise_comparison,
+)
+from data_quality import MISSING_PRICE_TOLERANCE
+from price_ranges import is_refreshing, new_segment_store, read_price_range
+from price_store import get_view_bars, get_view_resolution
+from profiling import profiled
+
+MA_WINDOWS = (5, 30, 60, 90, 180)
+SIGNAL_MA_WINDOWS = (5, 30, 90, 180)
+# Prices that failed validation are skipped rather than blanking whole windows
+INDICATOR_PARAMS = {
+    "sma_windows": MA_WINDOWS,
+    "missing_tolerance": MISSING_PRICE_TOLERANCE,
+}
+
+
+# Downloaded ranges per ticker, reused as the date range slider moves. The
+# default and most viewed tickers are kept warm after every close
+@st.cache_resource
+def get_price_segments():
+    return start_cache_warmer(new_segment_store(), INDICATOR_PARAMS)
+
+
+@profiled
 def run_stock_ticker_dashboard():
     # Parameters
     with st.sidebar:
@@ -36,6 +62,7 @@ def run_stock_ticker_dashboard():
         )
 
         ticker = st.text_input("Ticker", "AMZN")
+        compare_tickers = st.multiselect("Compare with", COMPARE_TICKERS)
         start_of_period = dt.date(2015, 1, 1)
 
         date_range = st.slider(
@@ -55,27 +82,29 @@ def run_stock_ticker_dashboard():
             "Disclaimer: \nThis dashboard is not personal advice. It does not constitute a personal recommendation to buy, sell, or otherwise trade all or any of the investments which may be referred to. Data represented on charts is purely an illustration of dashboarding capabilities."
         )
 
-    df = read_yahoo_historical_data(ticker)
+    # Only the selected range plus the warm-up of MA_180 is downloaded, all MAs
+    # come out of one fused kernel pass
+    price_segments = get_price_segments()
+    df, indicators = read_price_range(
+        price_segments,
+        ticker,
+        date_range[0],
+        date_range[1],
+        INDICATOR_PARAMS,
+    )
 
     # Run Analysis
     df = df.sort_index(inplace=False)
     last_price = round(df.tail(1)["Adj Close"].values[0], 2)
     last_date = str(df.tail(1).index.values[0])[0:10]
+    if is_refreshing(price_segments, ticker):
+        st.caption("Newer prices are loading in the background, rerun to see them.")
 
-    df["MA_5"] = df["Adj Close"].rolling(window=5).mean()
-    df["Distance from MA_5"] = (df["Adj Close"] - df["MA_5"]) / df["MA_5"]
-
-    df["MA_30"] = df["Adj Close"].rolling(window=30).mean()
-    df["Distance from MA_30"] = (df["Adj Close"] - df["MA_30"]) / df["MA_30"]
-
-    df["MA_60"] = df["Adj Close"].rolling(window=60).mean()
-    df["Distance from MA_60"] = (df["Adj Close"] - df["MA_60"]) / df["MA_60"]
-
-    df["MA_90"] = df["Adj Close"].rolling(window=90).mean()
-    df["Distance from MA_90"] = (df["Adj Close"] - df["MA_90"]) / df["MA_90"]
-
-    df["MA_180"] = df["Adj Close"].rolling(window=180).mean()
-    df["Distance from MA_180"] = (df["Adj Close"] - df["MA_180"]) / df["MA_180"]
+    for window in MA_WINDOWS:
+        df[f"MA_{window}"] = indicators[f"SMA_{window}"]
+        df[f"Distance from MA_{window}"] = (df["Adj Close"] - df[f"MA_{window}"]) / df[
+            f"MA_{window}"
+        ]
 
     df["Monthly_Day_change_pc"] = (df["Adj Close"] - df["Adj Close"].shift(30)) / df[
         "Adj Close"
@@ -109,6 +138,10 @@ def run_stock_ticker_dashboard():
 
     df["combined_signal"] = df["sell_signal"] - df["buy_signal"]
 
+    # Warm-up rows were only needed for the MAs, the comparison reuses them
+    daily_prices = df
+    df = df.loc[pd.Timestamp(date_range[0]) : pd.Timestamp(date_range[1])].copy()
+
     df_big_moves = df.loc[
         (df["buy_signal"] >= signal_tolerance) | (df["sell_signal"] >= signal_tolerance)
     ]
@@ -125,13 +158,20 @@ def run_stock_ticker_dashboard():
     # st.line_chart(df[["Adj Close", "MA_5", "MA_30", "MA_90", "MA_180"]])
     # st.scatter_chart(df_big_moves_neg["Adj Close"])
 
+    # Long ranges are drawn from the weekly or monthly bar closes, signals stay daily
+    chart_resolution = get_view_resolution(date_range[0], date_range[1])
+    chart_df = df
+    if chart_resolution != "1d":
+        chart_bars = get_view_bars(ticker.upper(), df[["Adj Close"]], chart_resolution)
+        chart_df = df.loc[df.index.intersection(chart_bars.index)]
+
     fig, ax = plt.subplots()
 
-    ax.plot(df["Adj Close"], label="Price")
-    ax.plot(df["MA_5"], label="MA_5")
-    ax.plot(df["MA_30"], label="MA_30")
-    ax.plot(df["MA_90"], label="MA_90")
-    ax.plot(df["MA_180"], label="MA_180")
+    ax.plot(chart_df["Adj Close"], label="Price")
+    ax.plot(chart_df["MA_5"], label="MA_5")
+    ax.plot(chart_df["MA_30"], label="MA_30")
+    ax.plot(chart_df["MA_90"], label="MA_90")
+    ax.plot(chart_df["MA_180"], label="MA_180")
 
     ax.scatter(
         x=df_big_moves_buy.index,
@@ -181,3 +221,31 @@ def run_stock_ticker_dashboard():
 
     st.subheader("Underlying Stock data")
     st.write(df.sort_index(ascending=False))
+
+    if compare_tickers:
+        # Prices come from the shared segments and the primary ticker's frame is
+        # reused, then one indicator pass covers every compared ticker
+        comparison_tickers = [ticker.upper()] + [
+            compare_ticker
+            for compare_ticker in compare_tickers
+            if compare_ticker != ticker.upper()
+        ]
+        comparison = build_comparison(
+            read_comparison_prices(
+                price_segments,
+                comparison_tickers,
+                date_range,
+                INDICATOR_PARAMS,
+                loaded_prices={ticker.upper(): daily_prices},
+            ),
+            MA_WINDOWS,
+            SIGNAL_MA_WINDOWS,
+            signal_tolerance,
+        )
+
+        st.title(f"{', '.join(comparison_tickers)} Comparison")
+        st.plotly_chart(
+            plot_comparison(comparison, date_range, ma_window=90),
+            use_container_width=True,
+        )
+        st.write(summarise_comparison(comparison, date_range, ma_window=90))
@@ -1,6 +1,8 @@
 import datetime as dt
-import glob
-import os
+import json
+import math
+import sys
+from pathlib import Path
 
 import matplotlib.pyplot as plt
 import numpy as np
@@ -9,6 +11,27 @@ import streamlit as st
 import yfinance as yf
 from st_aggrid import AgGrid, GridOptionsBuilder
 
+# Shared dashboard modules live in Dashboard/
+sys.path.append(str(Path(__file__).resolve().parents[2] / "Dashboard"))
+from data_quality import clean_price_frame
+from indicators import compute_indicators, compute_time_indicators
+from intraday import iter_intraday_chunks, update_intraday_store
+from price_store import read_price_matrix, update_price_store
+from profiling import profiled
+from results_index import (
+    build_results_index,
+    find_latest_results_date,
+    get_ticker_rows,
+)
+from signal_clustering import (
+    collapse_signals,
+    load_signal_clusters,
+    update_signal_clusters,
+)
+from signal_events import file_sink, update_signal_events, webhook_sink
+from signal_table import build_signal_table, query_signal_table
+from threshold_calibration import load_ticker_thresholds, update_threshold_sketch
+
 
 def read_data(tickers, start_date, end_date=dt.datetime.now().date()):
     return yf.download(tickers, start=start_date, end=end_date)["Adj Close"]
@@ -18,7 +41,42 @@ def get_cols_by_substring(df, substring):
     return df.loc[:, [substring in i for i in df.columns]]
 
 
-def run_ma_analysis(tickers, ma_params, breach_limit_alert, data):
+def add_breach_signals(ticker_df, moving_averages, ma_params, breach_limit_alert):
+    for window, threshold in ma_params.items():
+        # Add the moving average prices to the ticker DataFrame
+        ticker_df[f"MA{window}"] = moving_averages[window]
+
+        # Calculate delta as a percentage of the price
+        moving_average = ticker_df[f"MA{window}"]
+        delta_pct = ((ticker_df["Price"] - moving_average) / moving_average) * 100
+        ticker_df[f"Delta_MA{window}_Pct"] = delta_pct
+
+        # Compare the delta percentage with the threshold to check for a breach
+        ticker_df[f"MA{window}_Breach"] = np.where(
+            delta_pct >= threshold, 1, np.where(delta_pct <= -threshold, -1, 0)
+        )  # 1 for upper breach, -1 for lower breach
+
+    # Calculate the total number of breaches for the ticker
+    ticker_df["Total_Breach"] = ticker_df.filter(like="_Breach").sum(
+        axis=1
+    )  # Count total breaches per day
+    ticker_df["Signal"] = np.where(
+        ticker_df["Total_Breach"] >= breach_limit_alert,
+        "SELL",
+        np.where(ticker_df["Total_Breach"] <= -breach_limit_alert, "BUY", ""),
+    )
+    return ticker_df
+
+
+@profiled
+def run_ma_analysis(
+    tickers,
+    ma_params,
+    breach_limit_alert,
+    data,
+    write_results=True,
+    ticker_thresholds=None,
+):
 
     # Extract the tickers from the data
     tickers = data.columns.tolist()  # Assuming tickers are the column names of `data`
@@ -26,95 +84,247 @@ def run_ma_analysis(tickers, ma_params, breach_limit_alert, data):
     # Create a main dictionary to store results for each ticker
     results = {}
 
+    # Validate the whole price matrix once, failed prices become NaN for the MAs
+    # while the raw prices are kept for display
+    raw_data = data[tickers]
+    data, quality_summary = clean_price_frame(raw_data)
+    flagged = quality_summary.loc[quality_summary.any(axis=1)]
+    if len(flagged):
+        print("Data quality flags:")
+        print(flagged)
+
+    # Calculate every moving average for every ticker in one fused kernel pass,
+    # NaN prices are skipped and the first `window` days average what is available
+    prices = data.to_numpy(dtype=float)
+    moving_averages = compute_indicators(
+        prices, sma_windows=tuple(ma_params), min_periods=1
+    )
+
     # Calculate moving averages and other metrics for each ticker
-    for ticker in tickers:
+    for column, ticker in enumerate(tickers):
         # Create an empty DataFrame for the current ticker
         ticker_df = pd.DataFrame(index=data.index)
 
         # Store the closing prices for the ticker
         ticker_df["Ticker"] = ticker
-        ticker_df["Price"] = data[ticker]
+        ticker_df["Price"] = raw_data[ticker]
+
+        # Calibrated per-ticker thresholds replace the global ones when given
+        ticker_ma_params = ma_params
+        if ticker_thresholds is not None and ticker in ticker_thresholds.index:
+            ticker_ma_params = ticker_thresholds.loc[ticker, list(ma_params)].to_dict()
+
+        ticker_df = add_breach_signals(
+            ticker_df,
+            {
+                window: moving_averages[f"SMA_{window}"][:, column]
+                for window in ma_params
+            },
+            ticker_ma_params,
+            breach_limit_alert,
+        )
 
-        # Create an empty DataFrame to store moving averages
-        ma_df = pd.DataFrame(index=data.index)
+        # Add the ticker DataFrame to the results dictionary
+        results[ticker] = ticker_df
 
-        # Calculate moving averages using cumulative sum for each window
-        for window, threshold in ma_params.items():
-            # Compute cumulative sum for the ticker
-            cumsum = data[ticker].cumsum()
+    if write_results:
+        write_ma_results(results, ma_params)
 
-            # Calculate moving average using the cumulative sum method
-            ma_df[f"MA{window}"] = (cumsum - cumsum.shift(window)).div(window)
+    results_recent = pd.concat([results[ticker].tail(1) for ticker in results])
 
-            # Correct for the first `window` days where rolling can't happen (copy first values)
-            ma_df.loc[: data.index[window - 1], f"MA{window}"] = (
-                data[ticker].iloc[:window].mean()
-            )
+    return results, results_recent[["Ticker", "Price", "Total_Breach", "Signal"]]
 
-            # Add the moving average prices to the ticker DataFrame
-            ticker_df[f"MA{window}"] = ma_df[f"MA{window}"]
-
-            # Calculate delta as a percentage of the price
-            delta_pct = (
-                (data[ticker] - ma_df[f"MA{window}"]) / ma_df[f"MA{window}"]
-            ) * 100
-            ticker_df[f"Delta_MA{window}_Pct"] = delta_pct
-
-            # Compare the delta percentage with the threshold to check for a breach
-            ticker_df[f"MA{window}_Breach"] = np.where(
-                delta_pct >= threshold, 1, np.where(delta_pct <= -threshold, -1, 0)
-            )  # 1 for upper breach, -1 for lower breach
-
-        # Calculate the total number of breaches for the ticker
-        ticker_df["Total_Breach"] = ticker_df.filter(like="_Breach").sum(
-            axis=1
-        )  # Count total breaches per day
-        ticker_df["Signal"] = np.where(
-            ticker_df["Total_Breach"] >= breach_limit_alert,
-            "SELL",
-            np.where(ticker_df["Total_Breach"] <= -breach_limit_alert, "BUY", ""),
-        )
 
-        # Add the ticker DataFrame to the results dictionary
-        results[ticker] = ticker_df
+def write_ma_results(results, ma_params):
+    results_df = pd.concat(results.values(), ignore_index=False).reset_index()
+    results_df_filename = (
+        "ma_results_" + results_df["Date"].max().strftime("%Y-%m-%d") + ".csv"
+    )
+    results_df_path = (
+        "/Users/virensamani/Projects/virenps.github.io/Dashboard/ma_results/"
+        + results_df_filename
+    )
+
+    results_df[
+        ["Date", "Ticker", "Price"]
+        + [f"Delta_MA{window}_Pct" for window in ma_params]
+        + [f"MA{window}_Breach" for window in ma_params]
+        + ["Total_Breach", "Signal"]
+    ].to_csv(results_df_path)
+
+    print("Written to MA analysis to file:", results_df_path)
+
+
+def run_incremental_ma_analysis(tickers, ma_params, breach_limit_alert, start_date):
+    ticker_cache_dir = Path(
+        "/Users/virensamani/Projects/virenps.github.io/Dashboard/ma_results/ticker_cache"
+    )
+    ticker_cache_dir.mkdir(parents=True, exist_ok=True)
+
+    # Revised tickers (re-adjusted by Yahoo) are re-downloaded in full by the store
+    changes = update_price_store(tickers, start_date)
+    for ticker, revised_from in changes["revised"].items():
+        print(f"Adj Close revised for {ticker} from {revised_from}, recomputing")
+    if changes["missing"]:
+        print("No prices downloaded for:", ", ".join(changes["missing"]))
+
+    # A revision only invalidates results from the first changed year onwards
+    revised_tickers = {
+        ticker: pd.Timestamp(revised_from)
+        for ticker, revised_from in changes["revised"].items()
+        if revised_from is not None and (ticker_cache_dir / f"{ticker}.pkl").exists()
+    }
+    full_tickers = [
+        ticker
+        for ticker in tickers
+        if ticker not in revised_tickers
+        and (
+            ticker in changes["revised"]
+            or ticker in changes["new"]
+            or not (ticker_cache_dir / f"{ticker}.pkl").exists()
+        )
+    ]
+    tail_tickers = [
+        ticker
+        for ticker in changes["appended"]
+        if ticker not in full_tickers and ticker not in revised_tickers
+    ]
 
-        results_df = pd.concat(results.values(), ignore_index=False).reset_index()
-        results_df_filename = (
-            "ma_results_" + results_df["Date"].max().strftime("%Y-%m-%d") + ".csv"
+    # Only the invalidated tickers get their full history recomputed
+    full_data = read_price_matrix(full_tickers)
+    if len(full_data.columns):
+        full_results, _ = run_ma_analysis(
+            full_tickers,
+            ma_params,
+            breach_limit_alert,
+            full_data,
+            write_results=False,
         )
-        results_df_path = (
-            "/Users/virensamani/Projects/virenps.github.io/Dashboard/ma_results/"
-            + results_df_filename
+        for ticker, ticker_df in full_results.items():
+            ticker_df.to_pickle(ticker_cache_dir / f"{ticker}.pkl")
+
+    # Revised tickers recompute from the first changed year less the longest window
+    if revised_tickers:
+        revised_data = read_price_matrix(list(revised_tickers))
+        first_row = revised_data.index.searchsorted(min(revised_tickers.values()))
+        revised_results, _ = run_ma_analysis(
+            list(revised_tickers),
+            ma_params,
+            breach_limit_alert,
+            revised_data.iloc[max(first_row - max(ma_params), 0) :],
+            write_results=False,
         )
+        for ticker, ticker_df in revised_results.items():
+            cached_df = pd.read_pickle(ticker_cache_dir / f"{ticker}.pkl")
+            revised_from = revised_tickers[ticker]
+            pd.concat(
+                [
+                    cached_df.loc[cached_df.index < revised_from],
+                    ticker_df.loc[ticker_df.index >= revised_from],
+                ]
+            ).to_pickle(ticker_cache_dir / f"{ticker}.pkl")
+
+    # Appended tickers only need the new rows plus the longest window of history
+    if tail_tickers:
+        last_rows = max(ma_params) + max(changes["appended"].values())
+        tail_results, _ = run_ma_analysis(
+            tail_tickers,
+            ma_params,
+            breach_limit_alert,
+            read_price_matrix(tail_tickers, last_rows=last_rows),
+            write_results=False,
+        )
+        for ticker, ticker_df in tail_results.items():
+            cached_df = pd.read_pickle(ticker_cache_dir / f"{ticker}.pkl")
+            new_rows = ticker_df.loc[ticker_df.index > cached_df.index.max()]
+            pd.concat([cached_df, new_rows]).to_pickle(
+                ticker_cache_dir / f"{ticker}.pkl"
+            )
 
-        results_df[
-            [
-                "Date",
-                "Ticker",
-                "Price",
-                "MA5_Breach",
-                "MA10_Breach",
-                "MA15_Breach",
-                "MA20_Breach",
-                "MA100_Breach",
-                "Total_Breach",
-                "Signal",
-            ]
-        ].to_csv(results_df_path)
-
-        results_recent = pd.DataFrame()
-        for ticker in results:
-            results_recent = pd.concat([results_recent, results[ticker].tail(1)])
+    results = {
+        ticker: pd.read_pickle(ticker_cache_dir / f"{ticker}.pkl")
+        for ticker in tickers
+        if (ticker_cache_dir / f"{ticker}.pkl").exists()
+    }
+    write_ma_results(results, ma_params)
 
-    print("Written to MA analysis to file:", results_df_path)
+    results_recent = pd.concat([results[ticker].tail(1) for ticker in results])
 
     return results, results_recent[["Ticker", "Price", "Total_Breach", "Signal"]]
 
 
-def plot_signals(results, ticker, tolerance=4, no_of_points=100):
-    results = results.set_index("Date")
+def run_intraday_ma_analysis(tickers, ma_params, breach_limit_alert, interval):
+    # ma_params keys are time windows here, e.g. {"1h": 0.5, "1D": 1.0, "5D": 2.5}.
+    # Each run only computes the bars after every ticker's last computed bar and
+    # appends them to the interval's results file
+    results_dir = Path(
+        "/Users/virensamani/Projects/virenps.github.io/Dashboard/ma_results"
+    )
+    results_df_path = results_dir / f"ma_intraday_results_{interval}.csv"
+    state_path = results_dir / f"ma_intraday_state_{interval}.json"
+    longest_window = max(pd.Timedelta(window) for window in ma_params)
+
+    state = {"windows": list(ma_params), "last_bars": {}}
+    if state_path.exists():
+        with open(state_path) as state_file:
+            stored_state = json.load(state_file)
+        # Different windows change every column, so the file is started again
+        if stored_state["windows"] == state["windows"] and results_df_path.exists():
+            state = stored_state
+    write_header = not state["last_bars"]
+
+    for ticker in tickers:
+        update_intraday_store(ticker, interval)
+
+        # Only the partitions holding the new bars and their warm-up are read
+        last_bar = state["last_bars"].get(ticker)
+        start = None
+        if last_bar is not None:
+            last_bar = pd.Timestamp(last_bar)
+            start = (last_bar - longest_window).date()
+
+        # Stream the on-disk bars a few days at a time instead of loading them all
+        for frame, first_new_bar in iter_intraday_chunks(
+            ticker, interval, warmup=longest_window, start=start
+        ):
+            moving_averages = compute_time_indicators(
+                frame.index, frame["Adj Close"].to_numpy(), sma_windows=tuple(ma_params)
+            )
+
+            ticker_df = pd.DataFrame(index=frame.index)
+            ticker_df["Ticker"] = ticker
+            ticker_df["Price"] = frame["Adj Close"]
+            ticker_df = add_breach_signals(
+                ticker_df,
+                {window: moving_averages[f"SMA_{window}"] for window in ma_params},
+                ma_params,
+                breach_limit_alert,
+            )
+
+            # Warm-up rows and bars written by earlier runs are skipped
+            is_new = ticker_df.index >= first_new_bar
+            if last_bar is not None:
+                is_new &= ticker_df.index > last_bar
+            new_rows = ticker_df.loc[is_new]
+            if len(new_rows):
+                new_rows.to_csv(
+                    results_df_path,
+                    mode="w" if write_header else "a",
+                    header=write_header,
+                )
+                write_header = False
+                state["last_bars"][ticker] = new_rows.index[-1].isoformat()
+
+    with open(state_path, "w") as state_file:
+        json.dump(state, state_file, indent=1)
+
+    print("Written to intraday MA analysis to file:", results_df_path)
+
+    return results_df_path
+
 
-    plot_df = results.loc[(results["Ticker"] == ticker)].tail(no_of_points)
+def plot_signals(results_index, ticker, tolerance=4, no_of_points=100):
+    plot_df = get_ticker_rows(results_index, ticker, no_of_points).set_index("Date")
 
     # Plotting
     plt.figure(figsize=(12, 6))
@@ -182,7 +392,19 @@ def plot_signals(results, ticker, tolerance=4, no_of_points=100):
     return plt
 
 
-def run_dashboard(results, daily_results):
+# Loaded before set_page_config, so no spinner element may be rendered here
+@st.cache_resource(show_spinner=False)
+def load_results_index(results_path):
+    return build_results_index(pd.read_csv(results_path))
+
+
+@st.cache_resource
+def get_signal_table(daily_results):
+    return build_signal_table(daily_results)
+
+
+@profiled
+def run_dashboard(results_index, daily_results, clusters=None):
     st.set_page_config(layout="wide")
 
     with st.sidebar:
@@ -194,29 +416,75 @@ def run_dashboard(results, daily_results):
         tolerance = st.number_input(
             label="Set tolerance level (Positive value)", value=4
         )
+        # Correlated names (GOOG/GOOGL, semis, banks) shown as one signal
+        collapse_clusters = clusters is not None and st.checkbox(
+            "Collapse correlated signals", value=True
+        )
 
     st.title("MA Signals")
 
     st.subheader("Index Signals across SP100 and Nasdaq 100")
 
-    st.subheader("Buy Signals")
-    st.dataframe(
-        daily_results.loc[daily_results["Signal"] == "BUY"],
-        use_container_width=True,
-    )
+    if collapse_clusters:
+        daily_results = collapse_signals(daily_results, clusters)
+    signal_table = get_signal_table(daily_results)
+    page_size = 25
+
+    for signal, title in [("BUY", "Buy Signals"), ("SELL", "Sell Signals")]:
+        st.subheader(title)
+        # A pager appears once the signals no longer fit on one page
+        signal_rows = int(signal_table["signal_rows"].get(signal, np.zeros(0)).sum())
+        signal_pages = max(1, math.ceil(signal_rows / page_size))
+        signal_page_no = 1
+        if signal_pages > 1:
+            signal_page_no = int(
+                st.number_input(
+                    f"{title} page",
+                    min_value=1,
+                    max_value=signal_pages,
+                    value=1,
+                    key=f"{signal}_page",
+                )
+            )
+        signal_page, _, _ = query_signal_table(
+            signal_table,
+            signal=signal,
+            sort_by="Ticker",
+            page=signal_page_no,
+            page_size=page_size,
+        )
+        st.dataframe(signal_page, use_container_width=True)
+        first_row = (signal_page_no - 1) * page_size
+        st.caption(
+            f"Showing {first_row + min(len(signal_page), 1)}-"
+            f"{first_row + len(signal_page)} of {signal_rows} rows"
+        )
 
-    st.subheader("Sell Signals")
-    st.dataframe(
-        daily_results.loc[daily_results["Signal"] == "SELL"],
-        use_container_width=True,
+    # Filtering, sorting and paging run server-side, the grid only receives one page
+    filter_col, search_col, sort_col, order_col, page_col = st.columns(5)
+    with filter_col:
+        signal_filter = st.selectbox("Signal", ["All", "BUY", "SELL"])
+    with search_col:
+        ticker_search = st.text_input("Ticker search", "")
+    with sort_col:
+        sort_by = st.selectbox("Sort by", list(signal_table["sort_orders"]))
+    with order_col:
+        ascending = st.radio("Order", ["Ascending", "Descending"]) == "Ascending"
+    with page_col:
+        page = int(st.number_input("Page", min_value=1, value=1))
+
+    daily_results_signals, total_rows, page_count = query_signal_table(
+        signal_table,
+        signal=None if signal_filter == "All" else signal_filter,
+        ticker_search=ticker_search,
+        sort_by=sort_by,
+        ascending=ascending,
+        page=page,
+        page_size=page_size,
     )
-
-    daily_results_signals = daily_results.loc[
-        (daily_results["Signal"].notna())
-    ].sort_values(by="Signal")
+    st.caption(f"Page {min(page, page_count)} of {page_count} ({total_rows} rows)")
 
     builder = GridOptionsBuilder.from_dataframe(daily_results_signals)
-    builder.configure_pagination(enabled=True)
     builder.configure_selection(selection_mode="single", use_checkbox=True)
     grid_options = builder.build()
 
@@ -233,14 +501,17 @@ def run_dashboard(results, daily_results):
         st.subheader("Parameters:")
         ticker = st.selectbox(
             "Select your ticker",
-            set(results["Ticker"].values),
+            results_index["tickers"],
             index=None,
             placeholder="Select ticker...",
             key="search_1",
         )
 
     plot_signals(
-        results=results, ticker=ticker, tolerance=tolerance, no_of_points=no_of_points
+        results_index=results_index,
+        ticker=ticker,
+        tolerance=tolerance,
+        no_of_points=no_of_points,
     )
     st.pyplot(plt.gcf())
 
@@ -437,6 +708,13 @@ if __name__ == "__main__":
     #     breach_limit_alert=breach_limit_alert,
     #     data=data,
     # )
+    # # Or: update the price store and only recompute new/revised tickers
+    # results, results_summarised = run_incremental_ma_analysis(
+    #     tickers=tickers_index_full,
+    #     ma_params=ma_params,
+    #     breach_limit_alert=breach_limit_alert,
+    #     start_date=dt.date(2020, 1, 1),
+    # )
     # daily_results_signals = (
     #     results.sort_values(["Ticker", "Signal"], ascending=[True, False])
     #     .loc[(results["Date"] == results["Date"].max())]
@@ -450,25 +728,65 @@ if __name__ == "__main__":
     #     + ".csv"
     # )
 
+    # # Weekly signals: ma_params windows count weekly bars, read from the price
+    # # store's pre-aggregated bars rather than the daily history
+    # weekly_results, weekly_results_summarised = run_ma_analysis(
+    #     tickers=tickers_index_full,
+    #     ma_params=ma_params,
+    #     breach_limit_alert=breach_limit_alert,
+    #     data=read_price_matrix(tickers_index_full, resolution="1wk"),
+    #     write_results=False,
+    # )
+
+    # # Or: per-ticker thresholds calibrated from each ticker's own Delta_MA*_Pct
+    # # distribution, then fold today's deltas into the sketch for tomorrow
+    # ticker_thresholds = load_ticker_thresholds(
+    #     "/Users/virensamani/Projects/virenps.github.io/Dashboard/ma_results", ma_params
+    # )
+    # results, results_summarised = run_ma_analysis(
+    #     tickers=tickers_index_full,
+    #     ma_params=ma_params,
+    #     breach_limit_alert=breach_limit_alert,
+    #     data=data,
+    #     ticker_thresholds=ticker_thresholds,
+    # )
+    # update_threshold_sketch(
+    #     results,
+    #     "/Users/virensamani/Projects/virenps.github.io/Dashboard/ma_results",
+    #     ma_params,
+    # )
+
+    # # Cluster tickers by rolling return correlation so the dashboard can collapse
+    # # correlated signals, only the new days are folded into the stored Gram matrix
+    # update_signal_clusters(
+    #     data,
+    #     "/Users/virensamani/Projects/virenps.github.io/Dashboard/ma_results",
+    # )
+
+    # # Publish only what changed since the previous run (new BUY/SELL, cleared, streaks)
+    # update_signal_events(
+    #     results_summarised,
+    #     "/Users/virensamani/Projects/virenps.github.io/Dashboard/ma_results",
+    #     sinks=[
+    #         file_sink(
+    #             "/Users/virensamani/Projects/virenps.github.io/Dashboard/ma_results/ma_signal_events.jsonl"
+    #         ),
+    #         webhook_sink("http://localhost:8765/signal-events"),
+    #     ],
+    # )
+
     ma_results_dir = (
         "/Users/virensamani/Projects/virenps.github.io/Dashboard/ma_results"
     )
-    results_dates = []
-    for file_path in glob.glob(ma_results_dir + "/ma_results_*.csv"):
-        results_dates.append(
-            dt.datetime.strptime(
-                os.path.basename(file_path)[:-4][-10:], "%Y-%m-%d"
-            ).date()
-        )
-    latest_data_date = max(results_dates)
+    latest_data_date = find_latest_results_date(ma_results_dir)
 
     # # Read saved data file - change to read latest file
-    results = pd.read_csv(
+    results_index = load_results_index(
         f"/Users/virensamani/Projects/virenps.github.io/Dashboard/ma_results/ma_results_{latest_data_date}.csv"
     )
     daily_results = pd.read_csv(
         f"/Users/virensamani/Projects/virenps.github.io/Dashboard/ma_results/ma_daily_results_{latest_data_date}.csv"
     )
 
-    run_dashboard(results, daily_results)
+    run_dashboard(results_index, daily_results, load_signal_clusters(ma_results_dir))
     # plot_signals(daily_results, "AAPL")
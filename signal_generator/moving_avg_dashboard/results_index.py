@@ -0,0 +1,39 @@
+import datetime as dt
+import glob
+import os
+
+import numpy as np
+
+
+def build_results_index(results):
+    # Sort once by (Ticker, Date) so every ticker occupies a contiguous block of rows
+    frame = results.sort_values(["Ticker", "Date"], kind="stable").reset_index(
+        drop=True
+    )
+
+    tickers = np.asarray(frame["Ticker"], dtype=str)
+    unique_tickers, starts = np.unique(tickers, return_index=True)
+    stops = np.append(starts[1:], len(tickers))
+
+    offsets = {
+        ticker: (int(start), int(stop))
+        for ticker, start, stop in zip(unique_tickers.tolist(), starts, stops)
+    }
+
+    return {"frame": frame, "tickers": unique_tickers.tolist(), "offsets": offsets}
+
+
+def get_ticker_rows(results_index, ticker, no_of_points=None):
+    start, stop = results_index["offsets"].get(ticker, (0, 0))
+    if no_of_points is not None:
+        start = max(start, stop - no_of_points)
+    return results_index["frame"].iloc[start:stop]
+
+
+def find_latest_results_date(results_dir):
+    # Results files are named ma_results_YYYY-MM-DD.csv, None when there are none
+    results_dates = [
+        dt.datetime.strptime(os.path.basename(file_path)[:-4][-10:], "%Y-%m-%d").date()
+        for file_path in glob.glob(os.path.join(results_dir, "ma_results_*.csv"))
+    ]
+    return max(results_dates, default=None)
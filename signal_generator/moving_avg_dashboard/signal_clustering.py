@@ -0,0 +1,180 @@
+import os
+
+import numpy as np
+import pandas as pd
+
+CLUSTER_STATE_FILE = "ma_correlation_state.npz"
+CLUSTERS_FILE = "ma_clusters.csv"
+
+# Rolling window of daily returns the correlations are measured over
+CORRELATION_WINDOW = 120
+CORRELATION_THRESHOLD = 0.85
+BLOCK_SIZE = 512
+
+
+def get_returns(prices):
+    # dates x tickers log returns, missing returns count as no move
+    with np.errstate(divide="ignore", invalid="ignore"):
+        returns = np.diff(np.log(np.asarray(prices, dtype=float)), axis=0)
+    return np.nan_to_num(returns, nan=0.0, posinf=0.0, neginf=0.0)
+
+
+def get_block_gram(returns, block_size=BLOCK_SIZE):
+    # returns.T @ returns built one column block at a time to bound peak memory
+    n_tickers = returns.shape[1]
+    gram = np.empty((n_tickers, n_tickers))
+    for start in range(0, n_tickers, block_size):
+        block = slice(start, start + block_size)
+        gram[block] = returns[:, block].T @ returns
+    return gram
+
+
+def build_correlation_state(prices, window=CORRELATION_WINDOW):
+    # Running sums over the last `window` returns, enough to rebuild any correlation
+    returns = get_returns(prices.to_numpy(dtype=float))[-window:]
+    return {
+        "tickers": prices.columns.tolist(),
+        "last_date": str(prices.index[-1].date()),
+        "window": window,
+        "gram": get_block_gram(returns),
+        "sums": returns.sum(axis=0),
+        "squares": (returns**2).sum(axis=0),
+    }
+
+
+def update_correlation_state(state, prices):
+    # prices must cover the new days plus `window` days before them. Rows entering
+    # the window are added and rows leaving it removed as rank-k Gram updates
+    prices = prices[state["tickers"]]
+    returns = get_returns(prices.to_numpy(dtype=float))
+    returns_dates = prices.index[1:]
+    n_new = int((returns_dates > pd.Timestamp(state["last_date"])).sum())
+    if n_new == 0:
+        return state
+
+    window = state["window"]
+    if len(returns) < window + n_new:
+        return build_correlation_state(prices, window)
+
+    entering = returns[-n_new:]
+    leaving = returns[-(window + n_new) : -window]
+    state["gram"] += entering.T @ entering - leaving.T @ leaving
+    state["sums"] += entering.sum(axis=0) - leaving.sum(axis=0)
+    state["squares"] += (entering**2).sum(axis=0) - (leaving**2).sum(axis=0)
+    state["last_date"] = str(prices.index[-1].date())
+    return state
+
+
+def save_correlation_state(state, state_path):
+    np.savez(
+        state_path,
+        tickers=np.asarray(state["tickers"], dtype=str),
+        last_date=state["last_date"],
+        window=state["window"],
+        gram=state["gram"],
+        sums=state["sums"],
+        squares=state["squares"],
+    )
+
+
+def load_correlation_state(state_path):
+    if not os.path.exists(state_path):
+        return None
+    with np.load(state_path) as stored:
+        return {
+            "tickers": stored["tickers"].tolist(),
+            "last_date": str(stored["last_date"]),
+            "window": int(stored["window"]),
+            "gram": stored["gram"],
+            "sums": stored["sums"],
+            "squares": stored["squares"],
+        }
+
+
+def iter_correlated_pairs(
+    state, threshold=CORRELATION_THRESHOLD, block_size=BLOCK_SIZE
+):
+    # Correlations are formed one row block at a time and only the pairs above the
+    # threshold are kept, the full correlation matrix never exists
+    window = state["window"]
+    means = state["sums"] / window
+    stds = np.sqrt(np.clip(state["squares"] / window - means**2, 0, None))
+    n_tickers = len(state["tickers"])
+
+    for start in range(0, n_tickers, block_size):
+        block = slice(start, start + block_size)
+        covariance = state["gram"][block] / window - np.outer(means[block], means)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            correlation = covariance / np.outer(stds[block], stds)
+
+        # Upper triangle only, each pair is visited once
+        rows, columns = np.nonzero(correlation > threshold)
+        rows += start
+        is_upper = columns > rows
+        yield rows[is_upper], columns[is_upper]
+
+
+def find_root(parents, i):
+    while parents[i] != i:
+        parents[i] = parents[parents[i]]
+        i = parents[i]
+    return i
+
+
+def cluster_tickers(state, threshold=CORRELATION_THRESHOLD):
+    # Union-find over the correlated pairs, each cluster is named after a member
+    parents = np.arange(len(state["tickers"]))
+    for rows, columns in iter_correlated_pairs(state, threshold):
+        for row, column in zip(rows, columns):
+            row_root, column_root = find_root(parents, row), find_root(parents, column)
+            if row_root != column_root:
+                parents[max(row_root, column_root)] = min(row_root, column_root)
+
+    roots = [find_root(parents, i) for i in range(len(parents))]
+    return pd.Series(
+        [state["tickers"][root] for root in roots],
+        index=pd.Index(state["tickers"], name="Ticker"),
+        name="Cluster",
+    )
+
+
+def update_signal_clusters(prices, results_dir, threshold=CORRELATION_THRESHOLD):
+    # prices is the dates x tickers Adj Close matrix, at least the last window + 1
+    # rows; an unchanged universe only pays for the new days
+    state_path = os.path.join(results_dir, CLUSTER_STATE_FILE)
+    state = load_correlation_state(state_path)
+    if state is None or state["tickers"] != prices.columns.tolist():
+        state = build_correlation_state(prices)
+    else:
+        state = update_correlation_state(state, prices)
+    save_correlation_state(state, state_path)
+
+    clusters = cluster_tickers(state, threshold)
+    clusters.to_csv(os.path.join(results_dir, CLUSTERS_FILE))
+    return clusters
+
+
+def load_signal_clusters(results_dir):
+    clusters_path = os.path.join(results_dir, CLUSTERS_FILE)
+    if not os.path.exists(clusters_path):
+        return None
+    return pd.read_csv(clusters_path, index_col="Ticker")["Cluster"]
+
+
+def collapse_signals(daily_results, clusters):
+    # One row per cluster and signal: the ticker with the largest breach, the other
+    # members are listed alongside it
+    signals = daily_results.loc[daily_results["Signal"].notna()].copy()
+    signals["Cluster"] = signals["Ticker"].map(clusters).fillna(signals["Ticker"])
+    signals["Strength"] = signals["Total_Breach"].abs()
+
+    signals = signals.sort_values(["Strength", "Ticker"], ascending=[False, True])
+    grouped = signals.groupby(["Cluster", "Signal"], sort=False)
+    collapsed = grouped.head(1).copy()
+    members = grouped["Ticker"].agg(lambda tickers: ", ".join(sorted(tickers[1:])))
+    collapsed["Also"] = [
+        members.loc[(cluster, signal)]
+        for cluster, signal in zip(collapsed["Cluster"], collapsed["Signal"])
+    ]
+
+    return collapsed.drop(columns=["Cluster", "Strength"]).sort_index()
@@ -0,0 +1,129 @@
+import json
+import os
+import urllib.request
+
+import numpy as np
+import pandas as pd
+
+SIGNAL_STATE_FILE = "ma_signal_state.csv"
+SIGNAL_EVENTS_FILE = "ma_signal_events.jsonl"
+
+
+def build_signal_state(results_recent, previous_state=None):
+    # results_recent is the one-row-per-ticker summary returned by run_ma_analysis
+    current_state = results_recent.rename_axis("Date").reset_index()
+    current_state["Date"] = current_state["Date"].astype(str).str[0:10]
+    current_state["Signal"] = current_state["Signal"].fillna("")
+
+    # Streaks are carried forward from the stored state, never rebuilt from history
+    if previous_state is None or previous_state.empty:
+        previous_streak = pd.Series(0, index=current_state.index)
+        previous_signal = pd.Series("", index=current_state.index)
+        previous_date = pd.Series("", index=current_state.index)
+    else:
+        previous = previous_state.set_index("Ticker").reindex(current_state["Ticker"])
+        previous_streak = pd.Series(
+            previous["Streak"].fillna(0).to_numpy(), index=current_state.index
+        )
+        previous_signal = pd.Series(
+            previous["Signal"].fillna("").to_numpy(), index=current_state.index
+        )
+        previous_date = pd.Series(
+            previous["Date"].fillna("").astype(str).to_numpy(),
+            index=current_state.index,
+        )
+
+    is_signal = current_state["Signal"] != ""
+    is_same_signal = is_signal & (current_state["Signal"] == previous_signal)
+    # Re-running the batch for the same day must not extend a streak twice
+    is_rerun = previous_date == current_state["Date"]
+    current_state["Streak"] = np.where(
+        is_same_signal,
+        previous_streak + np.where(is_rerun, 0, 1),
+        np.where(is_signal, 1, 0),
+    ).astype(int)
+
+    return current_state[
+        ["Date", "Ticker", "Price", "Total_Breach", "Signal", "Streak"]
+    ]
+
+
+def diff_signal_states(previous_state, current_state):
+    if previous_state is None or previous_state.empty:
+        previous_state = pd.DataFrame(columns=["Date", "Ticker", "Signal"])
+
+    merged = current_state.merge(
+        previous_state[["Date", "Ticker", "Signal"]].rename(
+            columns={"Date": "Previous_Date", "Signal": "Previous_Signal"}
+        ),
+        on="Ticker",
+        how="left",
+    )
+    merged["Previous_Signal"] = merged["Previous_Signal"].fillna("")
+    is_new_day = merged["Previous_Date"].astype(str) != merged["Date"]
+
+    signal = merged["Signal"]
+    previous_signal = merged["Previous_Signal"]
+    merged["Event"] = np.select(
+        [
+            (signal == "BUY") & (previous_signal != "BUY"),
+            (signal == "SELL") & (previous_signal != "SELL"),
+            (signal == "") & (previous_signal != ""),
+            (signal != "") & (signal == previous_signal) & is_new_day,
+        ],
+        ["NEW_BUY", "NEW_SELL", "CLEARED", "STREAK_EXTENDED"],
+        default="",
+    )
+
+    return merged.loc[
+        merged["Event"] != "",
+        ["Date", "Ticker", "Event", "Signal", "Previous_Signal", "Streak", "Price"],
+    ].reset_index(drop=True)
+
+
+def file_sink(events_path):
+    def publish(events):
+        with open(events_path, "a") as events_file:
+            for event in events:
+                events_file.write(json.dumps(event) + "\n")
+
+    return publish
+
+
+def webhook_sink(url, timeout=5):
+    def publish(events):
+        request = urllib.request.Request(
+            url,
+            data=json.dumps({"events": events}).encode(),
+            headers={"Content-Type": "application/json"},
+        )
+        urllib.request.urlopen(request, timeout=timeout)
+
+    return publish
+
+
+def update_signal_events(results_recent, results_dir, sinks=None):
+    state_path = os.path.join(results_dir, SIGNAL_STATE_FILE)
+    previous_state = pd.read_csv(state_path) if os.path.exists(state_path) else None
+
+    current_state = build_signal_state(results_recent, previous_state)
+    events = diff_signal_states(previous_state, current_state)
+
+    # The state is saved before publishing so a failing sink can't make the next
+    # run publish the same events again
+    current_state.to_csv(state_path, index=False)
+
+    # Only the changed tickers are logged and published, a failing sink is
+    # reported and skipped so the others still receive the events
+    if sinks is None:
+        sinks = [file_sink(os.path.join(results_dir, SIGNAL_EVENTS_FILE))]
+    event_records = json.loads(events.to_json(orient="records"))
+    if event_records:
+        for publish in sinks:
+            try:
+                publish(event_records)
+            except Exception as error:
+                print(f"Publishing signal events failed: {error}")
+    print("Published", len(event_records), "signal events")
+
+    return events
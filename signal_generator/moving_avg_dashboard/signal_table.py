@@ -0,0 +1,62 @@
+import math
+
+import numpy as np
+
+
+def build_signal_table(daily_results, sort_columns=("Ticker", "Price", "Total_Breach")):
+    # Server-side copy of the signal rows with precomputed sort orders and filters
+    frame = (
+        daily_results.loc[daily_results["Signal"].notna()]
+        .sort_values(by=["Signal", "Ticker"])
+        .reset_index(drop=True)
+    )
+
+    sort_orders = {}
+    for column in sort_columns:
+        sort_orders[column] = np.argsort(frame[column].values, kind="stable")
+
+    signals = np.asarray(frame["Signal"], dtype=str)
+    signal_rows = {
+        signal: (signals == signal) for signal in np.unique(signals).tolist()
+    }
+
+    return {
+        "frame": frame,
+        "tickers": np.asarray(frame["Ticker"].str.upper(), dtype=str),
+        "sort_orders": sort_orders,
+        "signal_rows": signal_rows,
+    }
+
+
+def query_signal_table(
+    table,
+    signal=None,
+    ticker_search="",
+    sort_by=None,
+    ascending=True,
+    page=1,
+    page_size=25,
+):
+    frame = table["frame"]
+
+    # Filter on the precomputed masks rather than the frame itself
+    mask = np.ones(len(frame), dtype=bool)
+    if signal is not None:
+        mask &= table["signal_rows"].get(signal, np.zeros(len(frame), dtype=bool))
+    if ticker_search:
+        mask &= np.char.startswith(table["tickers"], ticker_search.upper())
+
+    if sort_by is None:
+        rows = np.flatnonzero(mask)
+    else:
+        order = table["sort_orders"][sort_by]
+        if not ascending:
+            order = order[::-1]
+        rows = order[mask[order]]
+
+    total_rows = len(rows)
+    page_count = max(1, math.ceil(total_rows / page_size))
+    page = min(max(1, page), page_count)
+
+    page_rows = rows[(page - 1) * page_size : page * page_size]
+    return frame.iloc[page_rows], total_rows, page_count
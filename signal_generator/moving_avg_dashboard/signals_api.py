@@ -0,0 +1,254 @@
+import email.utils
+import gzip
+import hashlib
+import json
+import os
+import threading
+import time
+import urllib.parse
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pandas as pd
+
+from results_index import build_results_index, find_latest_results_date, get_ticker_rows
+
+SIGNALS_API_HOST = "127.0.0.1"
+SIGNALS_API_PORT = 8503
+MA_RESULTS_DIR = "/Users/virensamani/Projects/virenps.github.io/Dashboard/ma_results"
+
+# How often the results directory is checked for a newer batch run
+RELOAD_INTERVAL_SECONDS = 30
+# Bodies smaller than this are sent uncompressed
+MIN_GZIP_BYTES = 512
+MAX_CACHED_RESPONSES = 4096
+
+
+def new_api_state(results_dir):
+    return {
+        "results_dir": results_dir,
+        "lock": threading.Lock(),
+        "snapshot": None,
+        "checked_at": None,
+        "loading": False,
+    }
+
+
+def get_results_key(results_dir):
+    latest_date = find_latest_results_date(results_dir)
+    if latest_date is None:
+        return None
+    results_path = os.path.join(results_dir, f"ma_results_{latest_date}.csv")
+    return results_path, int(os.path.getmtime(results_path))
+
+
+def load_snapshot(results_key):
+    results_path, last_modified = results_key
+    results = pd.read_csv(results_path)
+    results = results.drop(
+        columns=[column for column in results.columns if column.startswith("Unnamed")]
+    )
+    return {
+        "key": results_key,
+        "last_modified": last_modified,
+        "results_index": build_results_index(results),
+        "lock": threading.Lock(),
+        "responses": {},
+    }
+
+
+def get_snapshot(state):
+    # One thread at a time checks for a newer run, everyone else keeps being served
+    # the loaded snapshot until the new one is swapped in
+    with state["lock"]:
+        snapshot = state["snapshot"]
+        is_due = not state["loading"] and (
+            state["checked_at"] is None
+            or time.monotonic() - state["checked_at"] >= RELOAD_INTERVAL_SECONDS
+        )
+        if is_due:
+            state["loading"] = True
+            state["checked_at"] = time.monotonic()
+
+    if is_due:
+        try:
+            results_key = get_results_key(state["results_dir"])
+            if results_key is not None and (
+                snapshot is None or results_key != snapshot["key"]
+            ):
+                snapshot = load_snapshot(results_key)
+                with state["lock"]:
+                    state["snapshot"] = snapshot
+        finally:
+            with state["lock"]:
+                state["loading"] = False
+    return snapshot
+
+
+def get_records(frame):
+    return json.loads(frame.to_json(orient="records", date_format="iso"))
+
+
+def build_payload(snapshot, key):
+    frame = snapshot["results_index"]["frame"]
+    latest_date = frame["Date"].max()
+
+    if key[0] == "metadata":
+        latest = frame.loc[frame["Date"] == latest_date]
+        return {
+            "results_file": os.path.basename(snapshot["key"][0]),
+            "latest_date": latest_date,
+            "first_date": frame["Date"].min(),
+            "last_modified": email.utils.formatdate(
+                snapshot["last_modified"], usegmt=True
+            ),
+            "tickers": len(snapshot["results_index"]["tickers"]),
+            "rows": len(frame),
+            "ma_windows": [
+                int(column[len("Delta_MA") : -len("_Pct")])
+                for column in frame.columns
+                if column.startswith("Delta_MA")
+            ],
+            "signals": {
+                signal: int(count)
+                for signal, count in latest["Signal"].value_counts().items()
+            },
+        }
+
+    if key[0] == "signals":
+        _, signal = key
+        latest = frame.loc[
+            frame["Date"] == latest_date,
+            ["Date", "Ticker", "Price", "Total_Breach", "Signal"],
+        ]
+        if signal is not None:
+            latest = latest.loc[latest["Signal"] == signal]
+        return {"date": latest_date, "signals": get_records(latest)}
+
+    _, ticker, no_of_points = key
+    if ticker not in snapshot["results_index"]["offsets"]:
+        return None
+    history = get_ticker_rows(snapshot["results_index"], ticker, no_of_points)
+    return {"ticker": ticker, "history": get_records(history)}
+
+
+def get_response(snapshot, key):
+    # Every body is serialised, hashed and compressed once per snapshot
+    with snapshot["lock"]:
+        response = snapshot["responses"].get(key)
+    if response is not None:
+        return response
+
+    payload = build_payload(snapshot, key)
+    if payload is None:
+        return None
+    body = json.dumps(payload, separators=(",", ":")).encode()
+    body_hash = hashlib.md5(body).hexdigest()
+    # The gzip body is a different representation, so it gets its own ETag
+    response = {
+        "body": body,
+        "gzip_body": gzip.compress(body) if len(body) >= MIN_GZIP_BYTES else None,
+        "etag": f'"{body_hash}"',
+        "gzip_etag": f'"{body_hash}-gz"',
+    }
+
+    with snapshot["lock"]:
+        if len(snapshot["responses"]) >= MAX_CACHED_RESPONSES:
+            snapshot["responses"].clear()
+        snapshot["responses"][key] = response
+    return response
+
+
+def get_request_key(path, query):
+    # /metadata, /signals?signal=BUY and /signals/<ticker>?points=N
+    parts = path.strip("/").split("/")
+    if parts == ["metadata"]:
+        return ("metadata",)
+    if parts == ["signals"]:
+        signal = query.get("signal", [None])[0]
+        return ("signals", signal.upper() if signal else None)
+    if len(parts) == 2 and parts[0] == "signals":
+        points = query.get("points", [None])[0]
+        no_of_points = int(points) if points else None
+        if no_of_points is not None and no_of_points < 1:
+            raise ValueError(f"points must be at least 1, got {no_of_points}")
+        return ("history", parts[1].upper(), no_of_points)
+    return None
+
+
+def is_not_modified(headers, etag, last_modified):
+    # If-None-Match wins over If-Modified-Since when a client sends both
+    if_none_match = headers.get("If-None-Match")
+    if if_none_match is not None:
+        # Weak comparison, as RFC 9110 asks for If-None-Match
+        etags = [tag.strip().removeprefix("W/") for tag in if_none_match.split(",")]
+        return "*" in etags or etag in etags
+
+    if_modified_since = headers.get("If-Modified-Since")
+    if if_modified_since is not None:
+        try:
+            since = email.utils.parsedate_to_datetime(if_modified_since)
+        except (TypeError, ValueError):
+            return False
+        return last_modified <= since.timestamp()
+    return False
+
+
+class SignalsRequestHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        url = urllib.parse.urlparse(self.path)
+        try:
+            key = get_request_key(url.path, urllib.parse.parse_qs(url.query))
+        except ValueError:
+            self.send_error(400, "points must be a positive integer")
+            return
+        if key is None:
+            self.send_error(404)
+            return
+
+        snapshot = get_snapshot(self.server.api_state)
+        if snapshot is None:
+            self.send_error(503, "No MA results available yet")
+            return
+        response = get_response(snapshot, key)
+        if response is None:
+            self.send_error(404, f"No MA results for {key[1]}")
+            return
+
+        use_gzip = response["gzip_body"] is not None and "gzip" in self.headers.get(
+            "Accept-Encoding", ""
+        )
+        body = response["gzip_body"] if use_gzip else response["body"]
+        etag = response["gzip_etag"] if use_gzip else response["etag"]
+        is_cached = is_not_modified(self.headers, etag, snapshot["last_modified"])
+
+        self.send_response(304 if is_cached else 200)
+        self.send_header("ETag", etag)
+        self.send_header(
+            "Last-Modified",
+            email.utils.formatdate(snapshot["last_modified"], usegmt=True),
+        )
+        # Clients may keep a copy but must revalidate it, which is a cheap 304
+        self.send_header("Cache-Control", "no-cache")
+        self.send_header("Vary", "Accept-Encoding")
+        if is_cached:
+            self.end_headers()
+            return
+        self.send_header("Content-Type", "application/json")
+        if use_gzip:
+            self.send_header("Content-Encoding", "gzip")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+def run_signals_api(
+    results_dir=MA_RESULTS_DIR, host=SIGNALS_API_HOST, port=SIGNALS_API_PORT
+):
+    server = ThreadingHTTPServer((host, port), SignalsRequestHandler)
+    server.api_state = new_api_state(results_dir)
+    print(f"Signals API on http://{host}:{port}")
+    server.serve_forever()
+
+
+if __name__ == "__main__":
+    run_signals_api()
@@ -0,0 +1,144 @@
+import os
+
+import numpy as np
+import pandas as pd
+
+THRESHOLD_SKETCH_FILE = "ma_threshold_sketch.npz"
+
+# Log-spaced bins over |Delta_MA*_Pct| from 0.01% to 1000%: quantiles read from the
+# sketch are within one bin (about 5%) of the exact value, whatever the history length
+SKETCH_BIN_EDGES = np.concatenate([[0.0], np.geomspace(0.01, 1000, 241)])
+THRESHOLD_QUANTILE = 0.9
+MIN_SKETCH_COUNT = 60
+
+
+def new_sketch(windows):
+    return {
+        "tickers": [],
+        "windows": list(windows),
+        "counts": np.zeros((0, len(windows), len(SKETCH_BIN_EDGES) - 1), np.int64),
+        "last_dates": np.array([], dtype="datetime64[D]"),
+    }
+
+
+def save_sketch(sketch, sketch_path):
+    np.savez(
+        sketch_path,
+        tickers=np.asarray(sketch["tickers"], dtype=str),
+        windows=np.asarray(sketch["windows"]),
+        counts=sketch["counts"],
+        last_dates=sketch["last_dates"],
+    )
+
+
+def load_sketch(sketch_path, windows):
+    if not os.path.exists(sketch_path):
+        return new_sketch(windows)
+
+    with np.load(sketch_path) as stored:
+        sketch = {
+            "tickers": stored["tickers"].tolist(),
+            "windows": stored["windows"].tolist(),
+            "counts": stored["counts"],
+            "last_dates": stored["last_dates"],
+        }
+
+    # Windows changed in ma_params: start the distributions again
+    if sketch["windows"] != list(windows):
+        return new_sketch(windows)
+    return sketch
+
+
+def add_sketch_tickers(sketch, tickers):
+    new_tickers = [ticker for ticker in tickers if ticker not in sketch["tickers"]]
+    if new_tickers:
+        sketch["tickers"] = sketch["tickers"] + new_tickers
+        sketch["counts"] = np.concatenate(
+            [
+                sketch["counts"],
+                np.zeros((len(new_tickers),) + sketch["counts"].shape[1:], np.int64),
+            ]
+        )
+        sketch["last_dates"] = np.concatenate(
+            [
+                sketch["last_dates"],
+                np.full(len(new_tickers), np.datetime64("NaT"), "datetime64[D]"),
+            ]
+        )
+    return sketch
+
+
+def update_sketch(sketch, results):
+    # Only rows newer than each ticker's last sketched date are added, so a daily
+    # run costs one row per ticker and re-running the same day adds nothing
+    sketch = add_sketch_tickers(sketch, list(results))
+    ticker_rows = {ticker: i for i, ticker in enumerate(sketch["tickers"])}
+    delta_columns = [f"Delta_MA{window}_Pct" for window in sketch["windows"]]
+    n_windows = len(sketch["windows"])
+    n_bins = len(SKETCH_BIN_EDGES) - 1
+
+    for ticker, ticker_df in results.items():
+        row = ticker_rows[ticker]
+        dates = pd.DatetimeIndex(ticker_df.index).to_numpy().astype("datetime64[D]")
+        last_date = sketch["last_dates"][row]
+        is_new = np.isnat(last_date) | (dates > last_date)
+        if not is_new.any():
+            continue
+
+        deltas = np.abs(ticker_df.loc[is_new, delta_columns].to_numpy(dtype=float))
+        is_valid = ~np.isnan(deltas)
+        bins = np.clip(
+            np.searchsorted(SKETCH_BIN_EDGES, deltas, side="right") - 1, 0, n_bins - 1
+        )
+        window_bins = np.arange(n_windows) * n_bins + bins
+        sketch["counts"][row] += np.bincount(
+            window_bins[is_valid], minlength=n_windows * n_bins
+        ).reshape(n_windows, n_bins)
+        sketch["last_dates"][row] = dates[is_new].max()
+
+    return sketch
+
+
+def get_sketch_quantiles(counts, quantile):
+    # Linear interpolation inside the bin holding the quantile, for every
+    # ticker and window at once
+    cumulative = np.cumsum(counts, axis=-1)
+    totals = cumulative[..., -1:]
+    targets = quantile * totals
+    bins = np.argmax(cumulative >= targets, axis=-1)[..., None]
+
+    below = np.take_along_axis(cumulative, bins, axis=-1) - np.take_along_axis(
+        counts, bins, axis=-1
+    )
+    in_bin = np.take_along_axis(counts, bins, axis=-1)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        fraction = np.clip((targets - below) / in_bin, 0, 1)
+    lower = SKETCH_BIN_EDGES[bins]
+    upper = SKETCH_BIN_EDGES[bins + 1]
+    return np.where(totals > 0, lower + fraction * (upper - lower), np.nan)[..., 0]
+
+
+def get_ticker_thresholds(
+    sketch, ma_params, quantile=THRESHOLD_QUANTILE, min_count=MIN_SKETCH_COUNT
+):
+    # tickers x windows thresholds, the global ma_params where history is too short
+    thresholds = pd.DataFrame(
+        get_sketch_quantiles(sketch["counts"], quantile),
+        index=pd.Index(sketch["tickers"], name="Ticker"),
+        columns=sketch["windows"],
+    )
+    has_history = sketch["counts"].sum(axis=-1) >= min_count
+    return thresholds.where(has_history).fillna(pd.Series(ma_params)).round(2)
+
+
+def update_threshold_sketch(results, results_dir, ma_params):
+    sketch_path = os.path.join(results_dir, THRESHOLD_SKETCH_FILE)
+    sketch = update_sketch(load_sketch(sketch_path, ma_params), results)
+    save_sketch(sketch, sketch_path)
+    return sketch
+
+
+def load_ticker_thresholds(results_dir, ma_params, quantile=THRESHOLD_QUANTILE):
+    # Thresholds for today's run come from the history sketched on previous runs
+    sketch = load_sketch(os.path.join(results_dir, THRESHOLD_SKETCH_FILE), ma_params)
+    return get_ticker_thresholds(sketch, ma_params, quantile)